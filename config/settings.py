@@ -34,6 +34,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 
 THIRD_PARTY_APPS = [
@@ -189,6 +190,10 @@ MEDIA_URL = "/media/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# CACHES
+# ------------------------------------------------------------------------------
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 # LOGGING
 # ------------------------------------------------------------------------------
 LOGGING = {
@@ -273,6 +278,10 @@ SIMPLE_JWT = {
 MAX_UPLOAD_SIZE = 2097152
 BLOG_MEDIA_MAX_UPLOAD_SIZE = 2097152
 AUTH_LINK_EXP_TIME = 10
+POSTCODE_CENTROIDS_PATH = env(
+    "POSTCODE_CENTROIDS_PATH",
+    default=str(BASE_DIR / "data" / "postcode_centroids.npy"),
+)
 
 
 # OAUTH
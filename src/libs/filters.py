@@ -0,0 +1,101 @@
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Upper
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+from rest_framework.settings import api_settings
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for SearchFilter backed by PostgreSQL's pg_trgm.
+
+    Every search term must either occur in one of the `search_fields` or be
+    word-similar to it, which tolerates typos such as "picadilly". Both
+    predicates work on `UPPER(field)`, so a trigram GIN index on that
+    expression serves them. Results are annotated with a `search_rank` and
+    ranked by it, unless the request asks for an explicit ordering.
+
+    A view can set `search_alternative_q` to a `Q` that matches rows whether
+    or not the terms do, e.g. a postcode prefix.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        fields = [field.lstrip("^=@$") for field in search_fields]
+        search_q = Q()
+        rank = None
+        for term in search_terms:
+            term_q = Q()
+            for field in fields:
+                term_q |= Q(**{f"{field}__icontains": term})
+                term_q |= Q(TrigramWordSimilar(Upper(field), term.upper()))
+            search_q &= term_q
+
+            similarities = [
+                TrigramWordSimilarity(term.upper(), Upper(field)) for field in fields
+            ]
+            similarity = (
+                Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+            )
+            rank = similarity if rank is None else rank + similarity
+
+        alternative_q = getattr(view, "search_alternative_q", None)
+        if alternative_q is not None:
+            search_q |= alternative_q
+        queryset = queryset.filter(search_q).annotate(search_rank=rank)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by("-search_rank", *queryset.query.order_by)
+        return queryset
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search over a stored tsvector.
+
+    The view names the `search_vector_field` (a GIN-indexed SearchVectorField)
+    and the text search `search_config` it was built with. The query accepts
+    web search syntax ("quoted phrases", -excluded words, or). Results are
+    annotated with a `text_rank` and ranked by it, unless the request asks
+    for an explicit ordering.
+    """
+
+    search_param = "text_search"
+
+    def filter_queryset(self, request, queryset, view):
+        field = getattr(view, "search_vector_field", None)
+        text = request.query_params.get(self.search_param, "").strip()
+        if not field or not text:
+            return queryset
+
+        query = SearchQuery(
+            text,
+            search_type="websearch",
+            config=getattr(view, "search_config", "english"),
+        )
+        queryset = queryset.filter(**{field: query}).annotate(
+            text_rank=SearchRank(F(field), query)
+        )
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by("-text_rank", *queryset.query.order_by)
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "A ranked full-text search term.",
+                "schema": {"type": "string"},
+            },
+        ]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ParkingSpotConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "src.parking_spot"
+
+    def ready(self):
+        from src.parking_spot import signals  # noqa: F401
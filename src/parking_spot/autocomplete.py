@@ -0,0 +1,213 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from src.parking_spot.catalog import current_catalog_version
+from src.parking_spot.models import ParkingSpot
+from src.parking_spot.postcodes import normalize_postcode
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+# Spots saved by transactions that commit late can carry an `updated_at` just
+# before the last refresh, so every refresh looks back this far
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+# Lower ranks sort first
+RANK_NAME_PREFIX = 0
+RANK_NAME_TOKEN = 1
+RANK_ADDRESS_TOKEN = 2
+RANK_POSTCODE_TOKEN = 3
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def spot_tokens(name, address, postcode):
+    """`{token: best rank}` of the words a spot can be suggested for."""
+    normalized = normalize_postcode(postcode)
+    fields = (
+        (RANK_NAME_TOKEN, tokenize(name)),
+        (RANK_ADDRESS_TOKEN, tokenize(address)),
+        (
+            RANK_POSTCODE_TOKEN,
+            tokenize(normalized) + tokenize(normalized.replace(" ", "")),
+        ),
+    )
+    token_ranks = {}
+    for rank, tokens in fields:
+        for token in tokens:
+            token_ranks[token] = min(rank, token_ranks.get(token, rank))
+    return token_ranks
+
+
+class SuggestionIndex:
+    """
+    Prefix index over the tokens of active spots' names, addresses and
+    postcodes.
+
+    Tokens are kept in a sorted list, so every token starting with a prefix
+    is found with two binary searches. Each token maps to the ids of the spots
+    containing it, along with how well that field ranks as a suggestion.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.postings = {}
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, spot_id, name, address, postcode):
+        self.remove(spot_id)
+
+        token_ranks = spot_tokens(name, address, postcode)
+        for token, rank in token_ranks.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                insort(self.tokens, token)
+            self.postings[token][spot_id] = rank
+
+        suggestion = (address or name or "").strip().lower()
+        self.entries[spot_id] = (suggestion, (name or "").lower(), list(token_ranks))
+
+    def remove(self, spot_id):
+        entry = self.entries.pop(spot_id, None)
+        if entry is None:
+            return
+        for token in entry[2]:
+            postings = self.postings[token]
+            postings.pop(spot_id, None)
+            if not postings:
+                del self.postings[token]
+                del self.tokens[bisect_left(self.tokens, token)]
+
+    def _prefix_matches(self, prefix):
+        """`{spot_id: best rank}` of the spots with a token starting with `prefix`."""
+        start = bisect_left(self.tokens, prefix)
+        end = bisect_left(self.tokens, prefix + "\uffff")
+        matches = {}
+        for token in self.tokens[start:end]:
+            for spot_id, rank in self.postings[token].items():
+                if rank < matches.get(spot_id, RANK_POSTCODE_TOKEN + 1):
+                    matches[spot_id] = rank
+        return matches
+
+    def match(self, query):
+        """
+        `{spot_id: rank}` of the spots where every query token prefixes one of
+        the spot's tokens.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return {}
+
+        # Start from the most selective (longest) token to keep sets small
+        query_tokens.sort(key=len, reverse=True)
+        matches = self._prefix_matches(query_tokens[0])
+        for token in query_tokens[1:]:
+            if not matches:
+                break
+            other = self._prefix_matches(token)
+            matches = {
+                spot_id: min(rank, other[spot_id])
+                for spot_id, rank in matches.items()
+                if spot_id in other
+            }
+
+        query = query.strip().lower()
+        for spot_id in matches:
+            if self.entries[spot_id][1].startswith(query):
+                matches[spot_id] = RANK_NAME_PREFIX
+        return matches
+
+    def search(self, query, limit=10, order=None):
+        """
+        Distinct suggestions for the query, best first. `order` optionally maps
+        spot ids to a position that takes precedence (e.g. by distance); spots
+        missing from it are left out.
+        """
+        matches = self.match(query)
+        if order is None:
+            ranked = sorted(
+                matches,
+                key=lambda spot_id: (matches[spot_id], self.entries[spot_id][0]),
+            )
+        else:
+            ranked = sorted(
+                (spot_id for spot_id in matches if spot_id in order),
+                key=order.__getitem__,
+            )
+
+        suggestions = []
+        for spot_id in ranked:
+            suggestion = self.entries[spot_id][0]
+            if suggestion and suggestion not in suggestions:
+                suggestions.append(suggestion)
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+
+_index = None
+_index_version = None
+_index_watermark = None
+_index_lock = threading.RLock()
+
+
+def _refresh(index, since):
+    """
+    Re-read the spots changed since `since` (every active spot when `None`).
+    Returns the latest `updated_at` seen, or `since` if nothing changed.
+    """
+    spots = ParkingSpot.objects.all()
+    if since is not None:
+        spots = spots.filter(updated_at__gte=since - REFRESH_OVERLAP)
+    else:
+        spots = spots.filter(is_active=True)
+
+    latest = since
+    for spot_id, is_active, name, address, postcode, updated_at in spots.values_list(
+        "id", "is_active", "name", "address", "postcode", "updated_at"
+    ).iterator():
+        if is_active:
+            index.add(spot_id, name, address, postcode)
+        else:
+            index.remove(spot_id)
+        if latest is None or updated_at > latest:
+            latest = updated_at
+    return latest
+
+
+def _current_index():
+    """
+    The worker's suggestion index. When the catalog version moves, only the
+    spots updated since the last refresh are re-indexed; the index is rebuilt
+    from scratch if that leaves it out of step with the table (e.g. after a
+    spot was deleted).
+    """
+    global _index, _index_version, _index_watermark
+
+    version = current_catalog_version()
+    if _index is not None and _index_version == version:
+        return _index
+
+    watermark = _index_watermark
+    if _index is not None:
+        watermark = _refresh(_index, watermark)
+        if len(_index) != ParkingSpot.objects.filter(is_active=True).count():
+            _index = None
+    if _index is None:
+        _index = SuggestionIndex()
+        watermark = _refresh(_index, None)
+
+    _index_version, _index_watermark = version, watermark
+    return _index
+
+
+def suggest(query, limit=10, order=None):
+    """Suggestions from the worker's index; see `SuggestionIndex.search`."""
+    # The index is refreshed in place, so threads of a worker take turns
+    with _index_lock:
+        return _current_index().search(query, limit, order)
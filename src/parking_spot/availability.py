@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from src.parking_spot.bookings import bucket_end, bucket_start
+from src.parking_spot.constants import DAYS_OF_WEEK
+
+# Event kinds, in the order they are applied at the same instant: whatever
+# ends there is released before whatever starts there is taken
+_BOOKING_END = 0
+_CLOSE = 1
+_OPEN = 2
+_BOOKING_START = 3
+
+DAY_CODES = [code for code, _ in DAYS_OF_WEEK]
+
+
+def opening_windows(availabilities, start, end):
+    """
+    Opening hours between `start` and `end` as `(open, close)` pairs, from
+    `(day, start_time, end_time)` rows of the weekly schedule. A row ending
+    at or before its start runs past midnight. Without any rows the spot is
+    always open.
+    """
+    if not availabilities:
+        return [(start, end)]
+
+    schedule = {}
+    for day, opens_at, closes_at in availabilities:
+        schedule.setdefault(day, []).append((opens_at, closes_at))
+
+    windows = []
+    current_tz = timezone.get_current_timezone()
+    # The day before `start` may run past midnight into the period
+    date = timezone.localtime(start, current_tz).date() - timedelta(days=1)
+    while True:
+        day_start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+        if day_start >= end:
+            break
+        for opens_at, closes_at in schedule.get(DAY_CODES[date.weekday()], ()):
+            window_start = timezone.make_aware(datetime.combine(date, opens_at))
+            window_end = timezone.make_aware(datetime.combine(date, closes_at))
+            if window_end <= window_start:
+                window_end += timedelta(days=1)
+            window_start, window_end = max(window_start, start), min(window_end, end)
+            if window_start < window_end:
+                windows.append((window_start, window_end))
+        date += timedelta(days=1)
+    return windows
+
+
+def free_windows(openings, bookings, capacity, start, end):
+    """
+    Sweep over the opening windows and the `(start_time, end_time)` bookings
+    of one vehicle type, returning the merged `(start, end)` windows in which
+    the spot is open and fewer than `capacity` bookings hold a place.
+
+    Bookings are widened to whole occupancy buckets, the granularity at which
+    new bookings are checked, and those without an end run to `end`.
+    """
+    if capacity <= 0:
+        return []
+
+    events = []
+    for window_start, window_end in openings:
+        events.append((window_start, _OPEN))
+        events.append((window_end, _CLOSE))
+    for booking_start, booking_end in bookings:
+        booking_start = max(bucket_start(booking_start), start)
+        booking_end = min(bucket_end(booking_end), end) if booking_end else end
+        if booking_start < booking_end:
+            events.append((booking_start, _BOOKING_START))
+            events.append((booking_end, _BOOKING_END))
+    events.sort()
+
+    windows = []
+    open_depth = booked = 0
+    free_since = None
+    for moment, kind in events:
+        if kind == _OPEN:
+            open_depth += 1
+        elif kind == _CLOSE:
+            open_depth -= 1
+        elif kind == _BOOKING_START:
+            booked += 1
+        else:
+            booked -= 1
+
+        is_free = open_depth > 0 and booked < capacity
+        if is_free and free_since is None:
+            free_since = moment
+        elif not is_free and free_since is not None:
+            if moment > free_since:
+                if windows and windows[-1][1] == free_since:
+                    windows[-1] = (windows[-1][0], moment)
+                else:
+                    windows.append((free_since, moment))
+            free_since = None
+    return windows
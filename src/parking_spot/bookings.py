@@ -0,0 +1,430 @@
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import chain
+
+from django.db.models import F, Max
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from src.parking_spot.constants import OCCUPYING_STATUSES
+from src.parking_spot.models import (
+    Booking,
+    BookingHold,
+    BookingOccupancy,
+    ParkingSpotVehicleCapacity,
+)
+from src.parking_spot.schedule import DAY_INDEX
+
+OCCUPANCY_BUCKET = timedelta(minutes=15)
+# How long a hold keeps its place for the driver to complete checkout
+BOOKING_HOLD_TTL = timedelta(minutes=10)
+_BUCKET_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+# Most bookings a single bulk booking request may create
+BULK_BOOKING_MAX_OCCURRENCES = 100
+
+
+def bucket_start(moment):
+    """Start of the occupancy bucket containing `moment`."""
+    return (
+        _BUCKET_EPOCH + (moment - _BUCKET_EPOCH) // OCCUPANCY_BUCKET * OCCUPANCY_BUCKET
+    )
+
+
+def bucket_end(moment):
+    """End of the last occupancy bucket a period ending at `moment` touches."""
+    start = bucket_start(moment)
+    return start if start == moment else start + OCCUPANCY_BUCKET
+
+
+def occupancy_buckets(start_time, end_time):
+    """Starts of every bucket the period `[start_time, end_time)` touches."""
+    buckets = []
+    bucket = bucket_start(start_time)
+    while bucket < end_time:
+        buckets.append(bucket)
+        bucket += OCCUPANCY_BUCKET
+    return buckets
+
+
+def recurrence_windows(start_date, end_date, days, start_time, end_time):
+    """
+    Yield `(start, end)` of a daily window on each of the weekdays `days`
+    (e.g. `{"MON", "FRI"}`) from `start_date` to `end_date` inclusive, in the
+    current time zone. A window ending at or before its start time ends the
+    next day.
+    """
+    weekdays = {DAY_INDEX[day] for day in days}
+    overnight = end_time <= start_time
+    day = start_date
+    while day <= end_date:
+        if day.weekday() in weekdays:
+            end_day = day + timedelta(days=1) if overnight else day
+            yield (
+                timezone.make_aware(datetime.combine(day, start_time)),
+                timezone.make_aware(datetime.combine(end_day, end_time)),
+            )
+        day += timedelta(days=1)
+
+
+def count_occupancy(periods, since):
+    """`{bucket: count}` of the `(start_time, end_time)` periods from `since` on."""
+    counts = {}
+    for start_time, end_time in periods:
+        for bucket in occupancy_buckets(max(start_time, since), end_time):
+            counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def is_occupying(booking):
+    return booking.is_active and booking.status in OCCUPYING_STATUSES
+
+
+def lock_capacity(parking_spot, vehicle):
+    """
+    Lock the spot's active capacity rows for the vehicle type and return the
+    total capacity. Must run inside a transaction: the locks are held until it
+    ends, so bookings and occupancy changes of the same spot and vehicle type
+    happen one after the other.
+    """
+    capacities = (
+        ParkingSpotVehicleCapacity.objects.select_for_update()
+        .filter(parking_spot=parking_spot, vehicle_type=vehicle, is_active=True)
+        .order_by("id")
+        .values_list("capacity", flat=True)
+    )
+    return sum(capacities)
+
+
+def unreleased_holds(parking_spot, vehicle, bucket):
+    """
+    Expired holds still counted in the ledger bucket, until a booking of the
+    spot or `release_expired_booking_holds` frees their places. The arguments
+    may be expressions such as `OuterRef`s, for use in a subquery.
+    """
+    return BookingHold.objects.filter(
+        parking_spot=parking_spot,
+        vehicle=vehicle,
+        expires_at__lte=timezone.now(),
+        start_time__lt=bucket + OCCUPANCY_BUCKET,
+        end_time__gt=bucket,
+    )
+
+
+def open_ended_starts(parking_spot, vehicle, before):
+    """
+    Sorted start times of the occupying bookings without an end time that
+    start before `before`. Such a booking occupies its place from its start
+    onwards, so it is not in the ledger and is counted from here instead.
+    """
+    return sorted(
+        Booking.objects.occupying()
+        .filter(
+            parking_spot=parking_spot,
+            vehicle=vehicle,
+            end_time__isnull=True,
+            start_time__lt=before,
+        )
+        .values_list("start_time", flat=True)
+    )
+
+
+def open_ended_count(starts, bucket):
+    """How many of the open-ended bookings starting at `starts` occupy the bucket."""
+    return bisect_left(starts, bucket + OCCUPANCY_BUCKET)
+
+
+def occupancy_peak(parking_spot, vehicle, start_time, end_time):
+    """
+    Most bookings of the vehicle type in any bucket of the period, including
+    those without an end time.
+    """
+    rows = BookingOccupancy.objects.filter(
+        parking_spot=parking_spot,
+        vehicle_type=vehicle,
+        bucket__gte=bucket_start(start_time),
+        bucket__lt=end_time,
+    )
+    starts = open_ended_starts(parking_spot, vehicle, end_time)
+    if not starts:
+        return rows.aggregate(peak=Max("count"))["peak"] or 0
+
+    # Open-ended bookings only add up over time, so the peak is at a ledger
+    # bucket or in the last bucket of the period, where all of them count
+    peak = len(starts)
+    for bucket, count in rows.values_list("bucket", "count"):
+        peak = max(peak, count + open_ended_count(starts, bucket))
+    return peak
+
+
+def check_capacity(parking_spot, vehicle, start_time, end_time):
+    """
+    Make sure a place for the vehicle type is free over the period, reading
+    the occupancy ledger for its buckets and the bookings without an end
+    time. Locks the capacity rows (see `lock_capacity`) and first frees the
+    places of expired holds.
+    """
+    capacity = lock_capacity(parking_spot, vehicle)
+    release_expired_holds(parking_spot, vehicle)
+    if not capacity:
+        raise ValidationError(
+            {"vehicle": "The parking spot does not take this vehicle type."}
+        )
+
+    if occupancy_peak(parking_spot, vehicle, start_time, end_time) >= capacity:
+        raise ValidationError(
+            "The parking spot is fully booked for this vehicle type at that time."
+        )
+
+
+def check_capacity_many(parking_spot, vehicle, periods):
+    """
+    `check_capacity` for many periods at once, which also have to fit next
+    to each other. The ledger rows of all their buckets are read in one
+    query. Returns `{bucket: count}` of the periods, for `add_occupancy`.
+    """
+    capacity = lock_capacity(parking_spot, vehicle)
+    release_expired_holds(parking_spot, vehicle)
+    if not capacity:
+        raise ValidationError(
+            {"vehicle": "The parking spot does not take this vehicle type."}
+        )
+
+    wanted = Counter()
+    for start_time, end_time in periods:
+        wanted.update(occupancy_buckets(start_time, end_time))
+    booked = dict(
+        BookingOccupancy.objects.filter(
+            parking_spot=parking_spot, vehicle_type=vehicle, bucket__in=list(wanted)
+        ).values_list("bucket", "count")
+    )
+    starts = open_ended_starts(
+        parking_spot, vehicle, max(wanted, default=_BUCKET_EPOCH) + OCCUPANCY_BUCKET
+    )
+    full = [
+        bucket
+        for bucket, count in wanted.items()
+        if booked.get(bucket, 0) + open_ended_count(starts, bucket) + count > capacity
+    ]
+    if full:
+        raise ValidationError(
+            "The parking spot is fully booked for this vehicle type at "
+            f"{min(full):%Y-%m-%d %H:%M}."
+        )
+    return wanted
+
+
+def add_occupancy(parking_spot, vehicle, bucket_counts):
+    """
+    Add `{bucket: count}` to the ledger of a spot and vehicle type with one
+    bulk update and one bulk insert. Callers hold the capacity lock.
+    """
+    rows = BookingOccupancy.objects.filter(
+        parking_spot=parking_spot, vehicle_type=vehicle, bucket__in=list(bucket_counts)
+    )
+    existing = []
+    for row in rows:
+        row.count += bucket_counts[row.bucket]
+        existing.append(row)
+    BookingOccupancy.objects.bulk_update(existing, ["count"], batch_size=500)
+
+    seen = {row.bucket for row in existing}
+    BookingOccupancy.objects.bulk_create(
+        [
+            BookingOccupancy(
+                parking_spot=parking_spot,
+                vehicle_type=vehicle,
+                bucket=bucket,
+                count=count,
+            )
+            for bucket, count in bucket_counts.items()
+            if bucket not in seen
+        ],
+        batch_size=500,
+    )
+
+
+def change_occupancy(booking, delta):
+    """
+    Add `delta` (+1 or -1) to the ledger buckets of the booking (or hold).
+    Callers hold the capacity lock of its spot and vehicle type. Bookings
+    without an end time are not tracked, as they have no last bucket; the
+    capacity checks count them from the bookings table (`open_ended_starts`).
+    """
+    if booking.end_time is None or not delta:
+        return
+
+    buckets = occupancy_buckets(booking.start_time, booking.end_time)
+    rows = BookingOccupancy.objects.filter(
+        parking_spot_id=booking.parking_spot_id,
+        vehicle_type=booking.vehicle,
+        bucket__in=buckets,
+    )
+    if delta < 0:
+        rows.filter(count__lte=-delta).delete()
+        rows.update(count=F("count") + delta)
+        return
+
+    rows.update(count=F("count") + delta)
+    existing = set(rows.values_list("bucket", flat=True))
+    BookingOccupancy.objects.bulk_create(
+        [
+            BookingOccupancy(
+                parking_spot_id=booking.parking_spot_id,
+                vehicle_type=booking.vehicle,
+                bucket=bucket,
+                count=delta,
+            )
+            for bucket in buckets
+            if bucket not in existing
+        ]
+    )
+
+
+def change_booking_status(booking, status):
+    """
+    Save the booking's new status and move it in or out of the occupancy
+    ledger. A booking that starts occupying again must still fit. Must run
+    inside a transaction.
+    """
+    was_occupying = is_occupying(booking)
+    booking.status = status
+    occupying = is_occupying(booking)
+
+    if was_occupying != occupying:
+        if occupying and booking.end_time is not None:
+            check_capacity(
+                booking.parking_spot_id,
+                booking.vehicle,
+                booking.start_time,
+                booking.end_time,
+            )
+        else:
+            lock_capacity(booking.parking_spot_id, booking.vehicle)
+        change_occupancy(booking, 1 if occupying else -1)
+
+    booking.save(update_fields=["status", "updated_at"])
+
+
+def place_hold(parking_spot, vehicle, start_time, end_time, user):
+    """
+    Reserve a place for `BOOKING_HOLD_TTL`. Must run inside a transaction;
+    see `check_capacity`.
+    """
+    check_capacity(parking_spot, vehicle, start_time, end_time)
+    hold = BookingHold.objects.create(
+        parking_spot=parking_spot,
+        vehicle=vehicle,
+        start_time=start_time,
+        end_time=end_time,
+        user=user,
+        expires_at=timezone.now() + BOOKING_HOLD_TTL,
+    )
+    change_occupancy(hold, 1)
+    return hold
+
+
+def take_hold(hold_uuid, user, parking_spot, vehicle, start_time, end_time):
+    """
+    Consume the user's unexpired hold for exactly this booking. Its place in
+    the ledger passes to the booking, so capacity is not checked again. Must
+    run inside a transaction.
+    """
+    hold = (
+        BookingHold.objects.select_for_update()
+        .filter(uuid=hold_uuid, user=user, expires_at__gt=timezone.now())
+        .first()
+    )
+    if hold is None:
+        raise ValidationError({"hold": "The hold does not exist or has expired."})
+    if (hold.parking_spot_id, hold.vehicle, hold.start_time, hold.end_time) != (
+        parking_spot.id,
+        vehicle,
+        start_time,
+        end_time,
+    ):
+        raise ValidationError({"hold": "The booking does not match the hold."})
+    hold.delete()
+
+
+def release_holds(holds):
+    """Free the places of the holds and delete them. Callers hold the capacity locks."""
+    for hold in holds:
+        change_occupancy(hold, -1)
+    BookingHold.objects.filter(id__in=[hold.id for hold in holds]).delete()
+
+
+def release_expired_holds(parking_spot, vehicle, limit=None):
+    """
+    Free the places of the expired holds of a spot and vehicle type, under
+    its capacity lock. Holds being converted right now are skipped. Returns
+    how many were released.
+    """
+    expired = (
+        BookingHold.objects.select_for_update(skip_locked=True)
+        .filter(
+            parking_spot=parking_spot,
+            vehicle=vehicle,
+            expires_at__lte=timezone.now(),
+        )
+        .order_by("id")
+    )
+    expired = list(expired[:limit] if limit else expired)
+    release_holds(expired)
+    return len(expired)
+
+
+def rebuild_occupancy(parking_spot_id, vehicle, since, batch_size=2000):
+    """
+    Recompute the ledger of one spot and vehicle type from its occupying
+    bookings and unexpired holds ending after `since`, under the capacity
+    lock so that bookings made meanwhile are not lost. Expired holds are
+    dropped. Returns the number of buckets written.
+    """
+    lock_capacity(parking_spot_id, vehicle)
+    BookingHold.objects.filter(
+        parking_spot_id=parking_spot_id,
+        vehicle=vehicle,
+        expires_at__lte=timezone.now(),
+    ).delete()
+    BookingOccupancy.objects.filter(
+        parking_spot_id=parking_spot_id, vehicle_type=vehicle
+    ).delete()
+
+    bookings = (
+        Booking.objects.occupying()
+        .filter(
+            parking_spot_id=parking_spot_id,
+            vehicle=vehicle,
+            end_time__gt=since,
+        )
+        .values_list("start_time", "end_time")
+    )
+    holds = BookingHold.objects.filter(
+        parking_spot_id=parking_spot_id,
+        vehicle=vehicle,
+        end_time__gt=since,
+        expires_at__gt=timezone.now(),
+    ).values_list("start_time", "end_time")
+    counts = count_occupancy(
+        chain(
+            bookings.iterator(chunk_size=batch_size),
+            holds.iterator(chunk_size=batch_size),
+        ),
+        since,
+    )
+
+    BookingOccupancy.objects.bulk_create(
+        [
+            BookingOccupancy(
+                parking_spot_id=parking_spot_id,
+                vehicle_type=vehicle,
+                bucket=bucket,
+                count=count,
+            )
+            for bucket, count in counts.items()
+        ],
+        batch_size=batch_size,
+    )
+    return len(counts)
@@ -0,0 +1,45 @@
+from django.db import transaction
+from django.db.models import F
+
+from src.parking_spot.models import CatalogVersion
+
+PARKING_SPOT_CATALOG = "parking_spot"
+
+
+def current_catalog_version(name=PARKING_SPOT_CATALOG):
+    return (
+        CatalogVersion.objects.filter(name=name)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+def bump_catalog_version(name=PARKING_SPOT_CATALOG):
+    """Signal every worker that its in-process copy of the catalog is stale."""
+    updated = CatalogVersion.objects.filter(name=name).update(version=F("version") + 1)
+    if not updated:
+        CatalogVersion.objects.get_or_create(name=name, defaults={"version": 1})
+
+
+def _bump_is_scheduled(name):
+    connection = transaction.get_connection()
+    return any(
+        getattr(func, "catalog_name", None) == name
+        for _sids, func, *_ in connection.run_on_commit
+    )
+
+
+def schedule_catalog_version_bump(name=PARKING_SPOT_CATALOG):
+    """
+    Bump the version once the current transaction commits. However many
+    changes the transaction makes, the version is bumped only once.
+    """
+    if _bump_is_scheduled(name):
+        return
+
+    def bump():
+        bump_catalog_version(name)
+
+    bump.catalog_name = name
+    transaction.on_commit(bump)
@@ -0,0 +1,241 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Min, Q, Sum
+from django.db.models.functions import Floor
+from rest_framework.exceptions import ValidationError
+
+from src.parking_spot.geo import parse_coordinate
+from src.parking_spot.models import ParkingSpot, ParkingSpotCluster
+
+# Zoom levels above this return individual spots instead of clusters
+MAP_CLUSTER_MAX_ZOOM = 15
+MAP_MAX_ZOOM = 22
+# Each 256px map tile is split into 2**N x 2**N cluster cells (64px at N=2)
+CLUSTER_GRID_SUBDIVISION = 2
+MAP_MAX_SPOTS = 2000
+
+
+def parse_viewport(query_params):
+    """
+    Read `bbox` (`west,south,east,north`) and `zoom` from the query params.
+    Returns `((south, west, north, east), zoom)`. `west` may be greater than
+    `east` when the viewport crosses the antimeridian.
+    """
+    bbox = query_params.get("bbox", "")
+    parts = bbox.split(",")
+    if len(parts) != 4:
+        raise ValidationError({"bbox": "Expected `west,south,east,north`."})
+
+    west = parse_coordinate(parts[0], "bbox", 180)
+    south = parse_coordinate(parts[1], "bbox", 90)
+    east = parse_coordinate(parts[2], "bbox", 180)
+    north = parse_coordinate(parts[3], "bbox", 90)
+    if south > north:
+        raise ValidationError({"bbox": "South must not be greater than north."})
+
+    try:
+        zoom = int(query_params.get("zoom", ""))
+    except ValueError:
+        raise ValidationError({"zoom": "A valid integer is required."}) from None
+    if not 0 <= zoom <= MAP_MAX_ZOOM:
+        raise ValidationError({"zoom": f"Must be between 0 and {MAP_MAX_ZOOM}."})
+
+    return (south, west, north, east), zoom
+
+
+def viewport_q(south, west, north, east):
+    lat_q = Q(latitude__range=(south, north))
+    if west > east:
+        return lat_q & (Q(longitude__gte=west) | Q(longitude__lte=east))
+    return lat_q & Q(longitude__range=(west, east))
+
+
+def cluster_cell_size(zoom):
+    """Edge length in degrees of a cluster cell at the given zoom level."""
+    return 360.0 / (1 << (zoom + CLUSTER_GRID_SUBDIVISION))
+
+
+def cluster_cell(latitude, longitude, zoom):
+    """Returns the `(cell_x, cell_y)` grid cell containing the point."""
+    size = cluster_cell_size(zoom)
+    return int((longitude + 180.0) // size), int((latitude + 90.0) // size)
+
+
+def cell_q(zoom, cell_x, cell_y):
+    """Range predicate matching the spots inside a grid cell."""
+    size = cluster_cell_size(zoom)
+    return Q(
+        longitude__gte=cell_x * size - 180.0,
+        longitude__lt=(cell_x + 1) * size - 180.0,
+        latitude__gte=cell_y * size - 90.0,
+        latitude__lt=(cell_y + 1) * size - 90.0,
+    )
+
+
+def cell_aggregates(queryset, zoom):
+    """Per-cell count, coordinate sums and minimum hourly rate in one query."""
+    size = cluster_cell_size(zoom)
+    return (
+        queryset.order_by()
+        .annotate(
+            cell_x=Floor((F("longitude") + 180.0) / size, output_field=FloatField()),
+            cell_y=Floor((F("latitude") + 90.0) / size, output_field=FloatField()),
+        )
+        .values("cell_x", "cell_y")
+        .annotate(
+            count=Count("id"),
+            latitude_sum=Sum("latitude"),
+            longitude_sum=Sum("longitude"),
+            min_price=Min("rate_per_hour"),
+        )
+    )
+
+
+def cluster_spots(queryset, zoom):
+    """
+    Group the spots into grid cells for the zoom level in a single query.
+    Each cluster is `[count, latitude, longitude, min_rate_per_hour]`.
+    """
+    return [
+        [
+            row["count"],
+            round(row["latitude_sum"] / row["count"], 6),
+            round(row["longitude_sum"] / row["count"], 6),
+            row["min_price"],
+        ]
+        for row in cell_aggregates(queryset, zoom)
+    ]
+
+
+def clustered_spots():
+    """Spots that are shown on the public map."""
+    return ParkingSpot.objects.filter(is_active=True, is_archived=False)
+
+
+def precomputed_clusters(zoom, south, west, north, east):
+    """
+    Read the clusters of the viewport from the precomputed pyramid. Only the
+    cells of the viewport are touched, however many spots they contain.
+    """
+    min_x, min_y = cluster_cell(south, west, zoom)
+    max_x, max_y = cluster_cell(north, east, zoom)
+    if west > east:
+        cell_x_q = Q(cell_x__gte=min_x) | Q(cell_x__lte=max_x)
+    else:
+        cell_x_q = Q(cell_x__range=(min_x, max_x))
+
+    clusters = ParkingSpotCluster.objects.filter(
+        cell_x_q, zoom=zoom, cell_y__range=(min_y, max_y)
+    ).values_list("count", "latitude_sum", "longitude_sum", "min_price")
+    return [
+        [
+            count,
+            round(latitude_sum / count, 6),
+            round(longitude_sum / count, 6),
+            min_price,
+        ]
+        for count, latitude_sum, longitude_sum, min_price in clusters
+    ]
+
+
+def cluster_entry(parking_spot):
+    """
+    The `(latitude, longitude, rate_per_hour)` a spot contributes to the
+    pyramid, or `None` if it is not shown on the map.
+    """
+    if not parking_spot["is_active"] or parking_spot["is_archived"]:
+        return None
+    return (
+        parking_spot["latitude"],
+        parking_spot["longitude"],
+        parking_spot["rate_per_hour"],
+    )
+
+
+def update_clusters(previous, current):
+    """
+    Move a spot's contribution in the pyramid from `previous` to `current`
+    (either may be `None`), touching only the cells that change.
+    """
+    changes = {}
+    for key, entry in (("removed", previous), ("added", current)):
+        if entry is None:
+            continue
+        for zoom in range(MAP_CLUSTER_MAX_ZOOM + 1):
+            cell = (zoom, *cluster_cell(entry[0], entry[1], zoom))
+            changes.setdefault(cell, {})[key] = entry
+
+    with transaction.atomic():
+        # Sorted so that concurrent updates lock cells in the same order
+        for (zoom, cell_x, cell_y), change in sorted(changes.items()):
+            removed = change.get("removed")
+            added = change.get("added")
+            if removed == added:
+                continue
+            _update_cell(zoom, cell_x, cell_y, removed, added)
+
+
+def _update_cell(zoom, cell_x, cell_y, removed, added):
+    cluster, _ = ParkingSpotCluster.objects.select_for_update().get_or_create(
+        zoom=zoom,
+        cell_x=cell_x,
+        cell_y=cell_y,
+        defaults={"min_price": added[2] if added else 0},
+    )
+
+    if removed:
+        cluster.count -= 1
+        cluster.latitude_sum -= removed[0]
+        cluster.longitude_sum -= removed[1]
+    if added:
+        cluster.count += 1
+        cluster.latitude_sum += added[0]
+        cluster.longitude_sum += added[1]
+
+    if cluster.count <= 0:
+        cluster.delete()
+        return
+
+    if removed and removed[2] <= cluster.min_price:
+        # The cheapest spot may have left the cell; the spot's own row is
+        # already saved, so this reflects the cell's current members
+        cluster.min_price = (
+            clustered_spots()
+            .filter(cell_q(zoom, cell_x, cell_y))
+            .aggregate(min_price=Min("rate_per_hour"))["min_price"]
+        )
+    elif added:
+        cluster.min_price = min(cluster.min_price, added[2])
+
+    cluster.save()
+
+
+def rebuild_clusters():
+    """Recompute the whole pyramid from the spot table."""
+    with transaction.atomic():
+        ParkingSpotCluster.objects.all().delete()
+        for zoom in range(MAP_CLUSTER_MAX_ZOOM + 1):
+            ParkingSpotCluster.objects.bulk_create(
+                [
+                    ParkingSpotCluster(
+                        zoom=zoom,
+                        cell_x=int(row["cell_x"]),
+                        cell_y=int(row["cell_y"]),
+                        count=row["count"],
+                        latitude_sum=row["latitude_sum"],
+                        longitude_sum=row["longitude_sum"],
+                        min_price=row["min_price"],
+                    )
+                    for row in cell_aggregates(clustered_spots(), zoom)
+                ],
+                batch_size=1000,
+            )
+
+
+def viewport_spots(queryset):
+    """Individual spots as `[uuid, latitude, longitude, rate_per_hour]`."""
+    return [
+        [uuid, round(latitude, 6), round(longitude, 6), rate_per_hour]
+        for uuid, latitude, longitude, rate_per_hour in queryset.order_by(
+            "id"
+        ).values_list("uuid", "latitude", "longitude", "rate_per_hour")[:MAP_MAX_SPOTS]
+    ]
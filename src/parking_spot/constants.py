@@ -17,6 +17,11 @@ FEATURE_CHOICES = (
     ('GUARDS', 'Security Guards'),
 )
 
+# Bit of each value in the ParkingSpot masks. Only ever append to the choices
+# above: reordering them would change the meaning of stored masks
+VEHICLE_TYPE_BITS = {value: 1 << bit for bit, (value, _) in enumerate(VEHICLE_TYPES)}
+FEATURE_BITS = {value: 1 << bit for bit, (value, _) in enumerate(FEATURE_CHOICES)}
+
 DAYS_OF_WEEK = [
     ("MON", "Monday"),
     ("TUE", "Tuesday"),
@@ -32,4 +37,12 @@ STATUS_CHOICES = [
     ('CONFIRMED', 'Confirmed'),
     ('COMPLETED', 'Completed'),
     ('CANCELLED', 'Cancelled'),
-]
\ No newline at end of file
+]
+
+# Bookings in these statuses hold a place at the parking spot
+OCCUPYING_STATUSES = ('PENDING', 'CONFIRMED')
+
+# Postgres sequence the numbers of new bookings are drawn from
+BOOKING_NO_SEQUENCE = "parking_spot_booking_no_seq"
+# Zero padding of the sequence part, so that booking numbers sort as text
+BOOKING_NO_DIGITS = 8
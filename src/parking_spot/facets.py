@@ -0,0 +1,66 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import Count, F, Q, Sum
+
+from src.parking_spot.catalog import current_catalog_version
+from src.parking_spot.constants import FEATURE_BITS, VEHICLE_TYPE_BITS
+
+# Hourly rate buckets as `(min, max)`; the last one is open-ended
+PRICE_BUCKETS = [(0, 2), (2, 5), (5, 10), (10, 20), (20, None)]
+FACET_CACHE_TIMEOUT = 60
+FACET_CACHE_PREFIX = "parking_spot:facets:"
+
+
+def facet_cache_key(query_params, ignored=()):
+    """
+    Cache key of a filter state: the params sorted by name and value, so that
+    the same filters in a different order share an entry. Keyed on the catalog
+    version so that spot changes start a fresh set of entries.
+    """
+    normalized = urlencode(
+        sorted(
+            (name, value.strip())
+            for name in query_params
+            if name not in ignored
+            for value in query_params.getlist(name)
+        )
+    )
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    return f"{FACET_CACHE_PREFIX}{current_catalog_version()}:{digest}"
+
+
+def facet_counts(queryset):
+    """
+    Number of spots in the queryset, and how many of them have each feature,
+    take each vehicle type and fall in each hourly rate bucket, in a single
+    aggregate query over the spots' bitmasks.
+    """
+    aggregates = {"count": Count("id")}
+    for value, bit in FEATURE_BITS.items():
+        aggregates[f"feature_{value}"] = Sum(F("features_mask").bitand(bit))
+    for value, bit in VEHICLE_TYPE_BITS.items():
+        aggregates[f"vehicle_type_{value}"] = Sum(F("vehicle_types_mask").bitand(bit))
+    for position, (low, high) in enumerate(PRICE_BUCKETS):
+        bucket = Q(rate_per_hour__gte=low)
+        if high is not None:
+            bucket &= Q(rate_per_hour__lt=high)
+        aggregates[f"price_{position}"] = Count("id", filter=bucket)
+
+    row = queryset.order_by().aggregate(**aggregates)
+    # Each spot with the bit set adds the bit's value to the sum
+    return {
+        "count": row["count"],
+        "features": {
+            value: (row[f"feature_{value}"] or 0) // bit
+            for value, bit in FEATURE_BITS.items()
+        },
+        "vehicle_types": {
+            value: (row[f"vehicle_type_{value}"] or 0) // bit
+            for value, bit in VEHICLE_TYPE_BITS.items()
+        },
+        "price_buckets": [
+            {"min": low, "max": high, "count": row[f"price_{position}"]}
+            for position, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
@@ -0,0 +1,29 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+class BitStringField(models.Field):
+    """
+    Fixed-length PostgreSQL `bit(n)` column, read and written as a string of
+    `0`s and `1`s.
+    """
+
+    description = "Bit string of fixed length"
+
+    def __init__(self, *args, length, **kwargs):
+        self.length = length
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["length"] = self.length
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        return f"bit({self.length})"
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is not None and value.strip("01"):
+            raise ValidationError(f"{value!r} is not a bit string.")
+        return value
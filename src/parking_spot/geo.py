@@ -0,0 +1,315 @@
+import math
+
+import numpy as np
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+# Point-segment pairs compared at once when projecting points onto a route;
+# each of the handful of temporary arrays takes 8 bytes per pair
+ROUTE_PROJECTION_PAIRS = 500_000
+
+
+def parse_coordinate(value, name, limit):
+    try:
+        coordinate = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: "A valid number is required."}) from None
+    if not math.isfinite(coordinate):
+        raise ValidationError({name: "A valid number is required."})
+
+    if not -limit <= coordinate <= limit:
+        raise ValidationError({name: f"Must be between -{limit} and {limit}."})
+    return coordinate
+
+
+def parse_radius(query_params):
+    """Optional `radius` (km) query param; `None` when not given."""
+    radius = query_params.get("radius")
+    if not radius:
+        return None
+    try:
+        radius = float(radius)
+    except ValueError:
+        raise ValidationError({"radius": "A valid number is required."}) from None
+    if not math.isfinite(radius):
+        raise ValidationError({"radius": "A valid number is required."})
+    if radius <= 0:
+        raise ValidationError({"radius": "Radius must be greater than zero."})
+    return radius
+
+
+def parse_origin(query_params):
+    """
+    Read `latitude`/`longitude` (and the optional `radius` in km) from the query
+    params. Returns `(latitude, longitude, radius)` or `None` when no origin is given.
+    """
+    latitude = query_params.get("latitude")
+    longitude = query_params.get("longitude")
+    if not latitude or not longitude:
+        return None
+
+    latitude = parse_coordinate(latitude, "latitude", 90)
+    longitude = parse_coordinate(longitude, "longitude", 180)
+    return latitude, longitude, parse_radius(query_params)
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (
+        math.sin(d_lat / 2) ** 2
+        + math.cos(math.radians(lat1))
+        * math.cos(math.radians(lat2))
+        * math.sin(d_lng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(
+    latitude, longitude, lat_field="latitude", lng_field="longitude"
+):
+    """
+    Haversine distance (km) from the given origin to the row's coordinates,
+    as an ORM expression suitable for `annotate()`.
+    """
+    d_lat = Radians(F(lat_field) - Value(latitude)) / 2
+    d_lng = Radians(F(lng_field) - Value(longitude)) / 2
+    a = Power(Sin(d_lat), 2) + Cos(Radians(Value(latitude))) * Cos(
+        Radians(F(lat_field))
+    ) * Power(Sin(d_lng), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(
+        Least(Value(1.0), Sqrt(a), output_field=FloatField())
+    )
+
+
+def bounding_box(latitude, longitude, radius):
+    """
+    Returns `(min_lat, max_lat, min_lng, max_lng)` enclosing every point within
+    `radius` km of the origin. Longitudes may fall outside [-180, 180] when the
+    box crosses the antimeridian; `bounding_box_q` takes care of the wrap.
+    """
+    lat_delta = radius / KM_PER_DEGREE_LATITUDE
+    min_lat = max(latitude - lat_delta, -90.0)
+    max_lat = min(latitude + lat_delta, 90.0)
+
+    # Near the poles every longitude can be within the radius
+    widest_lat = max(abs(min_lat), abs(max_lat))
+    if widest_lat >= 89.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    lng_delta = radius / (KM_PER_DEGREE_LATITUDE * math.cos(math.radians(widest_lat)))
+    if lng_delta >= 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, longitude - lng_delta, longitude + lng_delta
+
+
+def bounding_box_q(min_lat, max_lat, min_lng, max_lng, prefix=""):
+    """Range predicate on latitude/longitude for the given box."""
+    lat_q = Q(**{f"{prefix}latitude__range": (min_lat, max_lat)})
+    if min_lng < -180.0:
+        lng_q = Q(**{f"{prefix}longitude__gte": min_lng + 360.0}) | Q(
+            **{f"{prefix}longitude__lte": max_lng}
+        )
+    elif max_lng > 180.0:
+        lng_q = Q(**{f"{prefix}longitude__gte": min_lng}) | Q(
+            **{f"{prefix}longitude__lte": max_lng - 360.0}
+        )
+    else:
+        lng_q = Q(**{f"{prefix}longitude__range": (min_lng, max_lng)})
+    return lat_q & lng_q
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of the point."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def geohash_cell_size(precision):
+    """Returns `(height, width)` in degrees of a geohash cell."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_cells_covering(latitude, longitude, radius):
+    """
+    Geohash prefixes whose cells together cover every point within `radius` km
+    of the origin: the origin's cell plus its neighbours, at the finest precision
+    where one cell is at least as large as the radius. Returns an empty list when
+    the radius is too large for prefix narrowing to help.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius)
+    lat_delta = max(latitude - min_lat, max_lat - latitude)
+    lng_delta = (max_lng - min_lng) / 2
+
+    precision = 0
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(candidate)
+        if height >= lat_delta and width >= lng_delta:
+            precision = candidate
+            break
+
+    if precision == 0:
+        return []
+
+    height, width = geohash_cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        cell_lat = latitude + lat_step * height
+        if not -90.0 <= cell_lat <= 90.0:
+            continue
+        for lng_step in (-1, 0, 1):
+            cell_lng = (longitude + lng_step * width + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+def geohash_cells_q(cells, field="geohash"):
+    """OR of prefix matches on the indexed geohash column."""
+    query = Q()
+    for cell in cells:
+        query |= Q(**{f"{field}__startswith": cell})
+    return query
+
+
+def decode_polyline(encoded, precision=5):
+    """Decode an encoded polyline into a list of `(latitude, longitude)` points."""
+    points = []
+    index = latitude = longitude = 0
+    factor = 10**precision
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                if index >= len(encoded):
+                    raise ValidationError({"polyline": "Invalid encoded polyline."})
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        latitude += deltas[0]
+        longitude += deltas[1]
+        points.append((latitude / factor, longitude / factor))
+
+    return points
+
+
+def route_boxes(route, width, max_boxes=50):
+    """
+    Bounding boxes, widened by `width` km, of consecutive runs of route
+    segments. Together they cover the whole corridor around the route.
+    """
+    latitudes, longitudes = np.asarray(route, dtype=np.float64).T
+    segment_count = max(len(route) - 1, 1)
+    step = -(-segment_count // max_boxes)
+
+    boxes = []
+    for start in range(0, segment_count, step):
+        end = min(start + step, segment_count) + 1
+        box_lat = latitudes[start:end]
+        box_lng = longitudes[start:end]
+        lat_delta = width / KM_PER_DEGREE_LATITUDE
+        widest_lat = min(max(abs(box_lat.min()), abs(box_lat.max())) + lat_delta, 89.0)
+        lng_delta = width / (
+            KM_PER_DEGREE_LATITUDE * math.cos(math.radians(widest_lat))
+        )
+        boxes.append(
+            (
+                max(box_lat.min() - lat_delta, -90.0),
+                min(box_lat.max() + lat_delta, 90.0),
+                box_lng.min() - lng_delta,
+                box_lng.max() + lng_delta,
+            )
+        )
+    return boxes
+
+
+def project_onto_route(route, latitudes, longitudes, max_pairs=ROUTE_PROJECTION_PAIRS):
+    """
+    Distance (km) of each point from the route and its position (km) along it,
+    measured at the nearest point of the route.
+
+    Every point is compared with every segment in a local equirectangular
+    projection scaled at each segment's mid-latitude. Points are taken in
+    chunks of at most `max_pairs` point-segment pairs, so memory stays bounded
+    however long the route is.
+    """
+    route = np.radians(np.asarray(route, dtype=np.float64))
+    if len(route) == 1:
+        route = np.vstack((route, route))
+    start, end = route[:-1], route[1:]
+    scale = np.cos((start[:, 0] + end[:, 0]) / 2)
+    segment_x = (end[:, 1] - start[:, 1]) * scale
+    segment_y = end[:, 0] - start[:, 0]
+    segment_length = np.hypot(segment_x, segment_y)
+    offsets = np.concatenate(([0.0], np.cumsum(segment_length)[:-1]))
+    length_squared = np.where(segment_length > 0, segment_length**2, 1.0)
+
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    distances = np.empty(len(latitudes))
+    positions = np.empty(len(latitudes))
+    chunk_size = max(max_pairs // len(start), 1)
+
+    for chunk in range(0, len(latitudes), chunk_size):
+        lat = latitudes[chunk : chunk + chunk_size, None]
+        lng = longitudes[chunk : chunk + chunk_size, None]
+        point_x = (lng - start[:, 1]) * scale
+        point_y = lat - start[:, 0]
+        t = np.clip((point_x * segment_x + point_y * segment_y) / length_squared, 0, 1)
+        gap = np.hypot(point_x - t * segment_x, point_y - t * segment_y)
+
+        nearest = np.argmin(gap, axis=1)
+        rows = np.arange(len(nearest))
+        distances[chunk : chunk + chunk_size] = gap[rows, nearest]
+        positions[chunk : chunk + chunk_size] = (
+            offsets[nearest] + t[rows, nearest] * segment_length[nearest]
+        )
+
+    return distances * EARTH_RADIUS_KM, positions * EARTH_RADIUS_KM
@@ -0,0 +1,110 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from src.parking_spot.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# How long a retry with the same key replays the stored response
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def idempotency_key(request):
+    """The request's `Idempotency-Key` header, or `None` when it was not sent."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+    key = key.strip()
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValidationError(
+            {
+                "idempotency_key": f"Must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} "
+                "characters long."
+            }
+        )
+    return key
+
+
+def request_hash(data):
+    """Digest of the request body, to tell a retry from a reused key."""
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def stored_response(user, key, digest):
+    """The response stored for an unexpired key, or `None`."""
+    stored = (
+        IdempotencyKey.objects.filter(user=user, key=key, expires_at__gt=timezone.now())
+        .only("request_hash", "response_status", "response_body")
+        .first()
+    )
+    if stored is None:
+        return None
+    if stored.request_hash != digest:
+        raise ValidationError(
+            {"idempotency_key": "This key was already used for a different request."}
+        )
+    return Response(stored.response_body, status=stored.response_status)
+
+
+def respond_idempotently(request, create_response):
+    """
+    Call `create_response()` once per idempotency key and user.
+
+    A retry with the same key gets the stored response back without the
+    request being validated or processed again. The key is claimed before
+    `create_response()` runs, in the same transaction, so a concurrent retry
+    waits on the unique index and then replays the response. Unsuccessful
+    responses are not stored, and the work they did is rolled back.
+    """
+    key = idempotency_key(request)
+    if key is None:
+        return create_response()
+
+    digest = request_hash(request.data)
+    response = stored_response(request.user, key, digest)
+    if response is not None:
+        return response
+
+    with transaction.atomic():
+        now = timezone.now()
+        IdempotencyKey.objects.filter(
+            user=request.user, key=key, expires_at__lte=now
+        ).delete()
+        try:
+            with transaction.atomic():
+                claim = IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    request_hash=digest,
+                    expires_at=now + IDEMPOTENCY_KEY_TTL,
+                )
+        except IntegrityError:
+            # A concurrent request with the key committed first
+            claim = None
+
+        if claim is None:
+            response = stored_response(request.user, key, digest)
+            if response is None:
+                raise ValidationError(
+                    {"idempotency_key": "A request with this key is in progress."}
+                )
+            return response
+
+        response = create_response()
+        if not status.is_success(response.status_code):
+            transaction.set_rollback(True)
+            return response
+
+        claim.response_status = response.status_code
+        claim.response_body = response.data
+        claim.save(update_fields=["response_status", "response_body"])
+    return response
@@ -0,0 +1,63 @@
+import csv
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from src.parking_spot.postcodes import POSTCODE_DTYPE, normalize_postcode
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a postcode -> centroid CSV (postcode, latitude, longitude columns) "
+        "into the memory-mapped table used for postcode searches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Path of the CSV file to import.")
+        parser.add_argument("--postcode-column", default="postcode")
+        parser.add_argument("--latitude-column", default="latitude")
+        parser.add_argument("--longitude-column", default="longitude")
+
+    def handle(self, *args, **options):
+        rows = []
+        skipped = 0
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8") as csv_file:
+                for record in csv.DictReader(csv_file):
+                    try:
+                        postcode = normalize_postcode(
+                            record[options["postcode_column"]]
+                        )
+                        latitude = float(record[options["latitude_column"]])
+                        longitude = float(record[options["longitude_column"]])
+                    except (KeyError, TypeError, ValueError):
+                        skipped += 1
+                        continue
+                    if (
+                        not postcode
+                        or len(postcode) > POSTCODE_DTYPE["postcode"].itemsize
+                    ):
+                        skipped += 1
+                        continue
+                    rows.append((postcode.encode(), latitude, longitude))
+        except OSError as err:
+            raise CommandError(f"Could not read {options['csv_path']}: {err}") from err
+
+        centroids = np.array(rows, dtype=POSTCODE_DTYPE)
+        centroids.sort(order="postcode", kind="stable")
+
+        # Write next to the target and swap it in, so that running workers
+        # never map a half-written file
+        path = settings.POSTCODE_CENTROIDS_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.tmp.npy"
+        np.save(temporary_path, centroids)
+        os.replace(temporary_path, path)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {len(centroids)} postcode centroids ({skipped} rows skipped)."
+            )
+        )
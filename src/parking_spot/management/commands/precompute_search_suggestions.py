@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from src.parking_spot.models import SuggestionQuery
+from src.parking_spot.suggestions import precompute_suggestions
+
+
+class Command(BaseCommand):
+    help = "Cache the search suggestions of the most popular queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=500)
+
+    def handle(self, *args, **options):
+        queries = list(
+            SuggestionQuery.objects.order_by("-count", "query").values_list(
+                "query", flat=True
+            )[: options["top"]]
+        )
+        precompute_suggestions(queries)
+        self.stdout.write(
+            self.style.SUCCESS(f"Suggestions cached for {len(queries)} queries.")
+        )
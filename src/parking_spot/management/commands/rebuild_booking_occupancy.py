@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from src.parking_spot.bookings import rebuild_occupancy
+from src.parking_spot.models import (
+    Booking,
+    BookingOccupancy,
+    ParkingSpotVehicleCapacity,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the booking occupancy ledger with the bookings, one parking "
+        "spot and vehicle type at a time. Buckets before now are dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        since = timezone.now()
+        groups = set(
+            ParkingSpotVehicleCapacity.objects.values_list(
+                "parking_spot_id", "vehicle_type"
+            ).distinct()
+        )
+        groups.update(
+            BookingOccupancy.objects.values_list(
+                "parking_spot_id", "vehicle_type"
+            ).distinct()
+        )
+        groups.update(
+            Booking.objects.occupying()
+            .filter(end_time__gt=since)
+            .values_list("parking_spot_id", "vehicle")
+            .distinct()
+        )
+
+        buckets = 0
+        for parking_spot_id, vehicle in sorted(groups):
+            # One short transaction per group keeps the capacity locks brief
+            with transaction.atomic():
+                buckets += rebuild_occupancy(
+                    parking_spot_id, vehicle, since, options["batch_size"]
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Occupancy rebuilt for {len(groups)} spot vehicle types "
+                f"({buckets} buckets)."
+            )
+        )
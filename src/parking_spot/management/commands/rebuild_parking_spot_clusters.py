@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from src.parking_spot.clustering import rebuild_clusters
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed map cluster pyramid from the parking spots."
+
+    def handle(self, *args, **options):
+        rebuild_clusters()
+        self.stdout.write(self.style.SUCCESS("Parking spot clusters rebuilt."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from src.parking_spot.models import ParkingSpot
+from src.parking_spot.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored full-text search vectors of the parking spots in "
+        "batches of ids. An interrupted run can be resumed with --start-after."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--start-after",
+            type=int,
+            default=0,
+            help="Only update spots with an id greater than this one.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = options["start_after"]
+        updated = 0
+
+        while True:
+            # Each batch is its own short transaction, keyed on the id cursor
+            ids = list(
+                ParkingSpot.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += update_search_vectors(ParkingSpot.objects.filter(id__in=ids))
+            last_id = ids[-1]
+            self.stdout.write(f"Updated {updated} spots (up to id {last_id}).")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Search vectors rebuilt for {updated} spots.")
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from src.parking_spot.bookings import lock_capacity, release_expired_holds
+from src.parking_spot.models import BookingHold
+
+
+class Command(BaseCommand):
+    help = "Free the places of expired booking holds, in batches per spot and vehicle type."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        groups = (
+            BookingHold.objects.filter(expires_at__lte=timezone.now())
+            .order_by("parking_spot_id", "vehicle")
+            .values_list("parking_spot_id", "vehicle")
+            .distinct()
+        )
+
+        released = 0
+        for parking_spot_id, vehicle in groups:
+            while True:
+                # Short transactions, so bookings of the spot wait briefly
+                with transaction.atomic():
+                    lock_capacity(parking_spot_id, vehicle)
+                    count = release_expired_holds(
+                        parking_spot_id, vehicle, options["batch_size"]
+                    )
+                released += count
+                if count < options["batch_size"]:
+                    break
+
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired holds."))
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+from src.parking_spot.geo import geohash_encode
+
+
+def populate_geohash(apps, schema_editor):
+    ParkingSpot = apps.get_model("parking_spot", "ParkingSpot")
+    batch = []
+    for parking_spot in ParkingSpot.objects.only(
+        "id", "latitude", "longitude"
+    ).iterator():
+        parking_spot.geohash = geohash_encode(
+            parking_spot.latitude, parking_spot.longitude
+        )
+        batch.append(parking_spot)
+        if len(batch) >= 1000:
+            ParkingSpot.objects.bulk_update(batch, ["geohash"])
+            batch = []
+    ParkingSpot.objects.bulk_update(batch, ["geohash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkingspot",
+            name="geohash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Geohash cell of latitude/longitude, used to narrow radius queries",
+                max_length=12,
+            ),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
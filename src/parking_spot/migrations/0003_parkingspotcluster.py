@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0002_parkingspot_geohash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParkingSpotCluster",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("zoom", models.PositiveSmallIntegerField()),
+                ("cell_x", models.IntegerField()),
+                ("cell_y", models.IntegerField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("latitude_sum", models.FloatField(default=0)),
+                ("longitude_sum", models.FloatField(default=0)),
+                ("min_price", models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="parkingspotcluster",
+            constraint=models.UniqueConstraint(
+                fields=("zoom", "cell_x", "cell_y"), name="unique_cluster_cell"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+from src.parking_spot.postcodes import normalize_postcode
+
+
+def populate_normalized_postcode(apps, schema_editor):
+    ParkingSpot = apps.get_model("parking_spot", "ParkingSpot")
+    batch = []
+    for parking_spot in ParkingSpot.objects.only("id", "postcode").iterator():
+        parking_spot.normalized_postcode = normalize_postcode(parking_spot.postcode)
+        batch.append(parking_spot)
+        if len(batch) >= 1000:
+            ParkingSpot.objects.bulk_update(batch, ["normalized_postcode"])
+            batch = []
+    ParkingSpot.objects.bulk_update(batch, ["normalized_postcode"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0004_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkingspot",
+            name="normalized_postcode",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Uppercased postcode with a single space, used for prefix lookups",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(populate_normalized_postcode, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 11:50
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0005_parkingspot_normalized_postcode"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="parkingspot",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="parkingspot_name_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingspot",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("address"),
+                    name="gin_trgm_ops",
+                ),
+                name="parkingspot_address_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingspot",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("postcode"),
+                    name="gin_trgm_ops",
+                ),
+                name="parkingspot_postcode_trgm",
+            ),
+        ),
+    ]
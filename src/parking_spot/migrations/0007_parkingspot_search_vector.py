@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 11:51
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0006_parkingspot_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkingspot",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                help_text="Weighted tsvector of name, address and description",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingspot",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="parkingspot_search_vector"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0007_parkingspot_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SuggestionQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("query", models.CharField(max_length=100, unique=True)),
+                ("count", models.PositiveBigIntegerField(default=0)),
+                ("last_searched_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+from src.parking_spot.constants import FEATURE_BITS, VEHICLE_TYPE_BITS
+
+
+def populate_masks(apps, schema_editor):
+    ParkingSpot = apps.get_model("parking_spot", "ParkingSpot")
+    ParkingSpotFeatures = apps.get_model("parking_spot", "ParkingSpotFeatures")
+    ParkingSpotVehicleCapacity = apps.get_model(
+        "parking_spot", "ParkingSpotVehicleCapacity"
+    )
+
+    features_masks = {}
+    for parking_spot_id, feature in (
+        ParkingSpotFeatures.objects.filter(is_active=True)
+        .values_list("parking_spot_id", "feature")
+        .iterator()
+    ):
+        features_masks[parking_spot_id] = features_masks.get(
+            parking_spot_id, 0
+        ) | FEATURE_BITS.get(feature, 0)
+
+    vehicle_types_masks = {}
+    for parking_spot_id, vehicle_type in (
+        ParkingSpotVehicleCapacity.objects.filter(is_active=True)
+        .values_list("parking_spot_id", "vehicle_type")
+        .iterator()
+    ):
+        vehicle_types_masks[parking_spot_id] = vehicle_types_masks.get(
+            parking_spot_id, 0
+        ) | VEHICLE_TYPE_BITS.get(vehicle_type, 0)
+
+    batch = []
+    for parking_spot in ParkingSpot.objects.only("id").iterator():
+        parking_spot.features_mask = features_masks.get(parking_spot.id, 0)
+        parking_spot.vehicle_types_mask = vehicle_types_masks.get(parking_spot.id, 0)
+        batch.append(parking_spot)
+        if len(batch) >= 1000:
+            ParkingSpot.objects.bulk_update(
+                batch, ["features_mask", "vehicle_types_mask"]
+            )
+            batch = []
+    ParkingSpot.objects.bulk_update(batch, ["features_mask", "vehicle_types_mask"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0008_suggestionquery"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkingspot",
+            name="features_mask",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Bits (FEATURE_BITS) of the spot's active features",
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkingspot",
+            name="vehicle_types_mask",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Bits (VEHICLE_TYPE_BITS) of the spot's active vehicle capacities",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parkingspot",
+            index=models.Index(
+                fields=["is_active", "features_mask", "vehicle_types_mask"],
+                name="parkingspot_active_masks",
+            ),
+        ),
+        migrations.RunPython(populate_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0009_parkingspot_masks"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["parking_spot", "vehicle", "start_time"],
+                name="booking_spot_vehicle_start",
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 11:56
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0010_booking_spot_vehicle_start"),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name="booking",
+            name="period",
+            field=django.contrib.postgres.fields.ranges.DateTimeRangeField(
+                editable=False,
+                help_text="[start_time, end_time) range, unbounded without an end time",
+                null=True,
+            ),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE parking_spot_booking
+            SET period = CASE
+                WHEN end_time IS NULL OR end_time >= start_time
+                THEN tstzrange(start_time, end_time, '[)')
+                ELSE 'empty'::tstzrange
+            END
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=django.contrib.postgres.indexes.GistIndex(
+                condition=models.Q(
+                    ("is_active", True),
+                    models.Q(("status", "CANCELLED"), _negated=True),
+                ),
+                fields=["parking_spot", "vehicle", "period"],
+                name="booking_occupying_period",
+            ),
+        ),
+    ]
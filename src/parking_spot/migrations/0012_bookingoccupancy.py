@@ -0,0 +1,143 @@
+# Generated by Django 4.2 on 2026-10-18 11:58
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from itertools import groupby
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+from src.parking_spot.constants import OCCUPYING_STATUSES
+
+# The ledger's buckets as they were when this migration was written; kept
+# here so that later changes to `src.parking_spot.bookings` leave it alone
+OCCUPANCY_BUCKET = timedelta(minutes=15)
+BUCKET_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def count_occupancy(periods, since):
+    """`{bucket: count}` of the `(start_time, end_time)` periods from `since` on."""
+    counts = {}
+    for start_time, end_time in periods:
+        start_time = max(start_time, since)
+        bucket = (
+            BUCKET_EPOCH
+            + (start_time - BUCKET_EPOCH) // OCCUPANCY_BUCKET * OCCUPANCY_BUCKET
+        )
+        while bucket < end_time:
+            counts[bucket] = counts.get(bucket, 0) + 1
+            bucket += OCCUPANCY_BUCKET
+    return counts
+
+
+def populate_occupancy(apps, schema_editor):
+    """
+    Count the occupying bookings with an end time into the ledger, as
+    `rebuild_occupancy` does. Buckets before now are left out.
+    """
+    Booking = apps.get_model("parking_spot", "Booking")
+    BookingOccupancy = apps.get_model("parking_spot", "BookingOccupancy")
+
+    since = timezone.now()
+    bookings = (
+        Booking.objects.filter(
+            is_active=True,
+            status__in=OCCUPYING_STATUSES,
+            end_time__isnull=False,
+            end_time__gt=since,
+        )
+        .order_by("parking_spot_id", "vehicle")
+        .values_list("parking_spot_id", "vehicle", "start_time", "end_time")
+    )
+    for (parking_spot_id, vehicle), rows in groupby(
+        bookings.iterator(chunk_size=2000), key=lambda row: row[:2]
+    ):
+        counts = count_occupancy(
+            ((start_time, end_time) for _, _, start_time, end_time in rows), since
+        )
+        BookingOccupancy.objects.bulk_create(
+            [
+                BookingOccupancy(
+                    parking_spot_id=parking_spot_id,
+                    vehicle_type=vehicle,
+                    bucket=bucket,
+                    count=count,
+                )
+                for bucket, count in counts.items()
+            ],
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0011_booking_period"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "vehicle_type",
+                    models.CharField(
+                        choices=[
+                            ("SMALL", "Small Car"),
+                            ("MEDIUM", "Medium Car"),
+                            ("SUV", "Large Car (SUV)"),
+                            ("BIKE", "Bike"),
+                            ("TRUCK", "Truck"),
+                            ("MINIBUS", "Minibus"),
+                            ("VAN", "Van"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("bucket", models.DateTimeField(help_text="Start of the time bucket")),
+                ("count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name="booking",
+            name="booking_occupying_period",
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=django.contrib.postgres.indexes.GistIndex(
+                condition=models.Q(
+                    ("is_active", True), ("status__in", ("PENDING", "CONFIRMED"))
+                ),
+                fields=["parking_spot", "vehicle", "period"],
+                name="booking_occupying_period",
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookingoccupancy",
+            name="parking_spot",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="occupancy",
+                to="parking_spot.parkingspot",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="bookingoccupancy",
+            constraint=models.UniqueConstraint(
+                fields=("parking_spot", "vehicle_type", "bucket"),
+                name="unique_occupancy_bucket",
+            ),
+        ),
+        migrations.RunPython(populate_occupancy, migrations.RunPython.noop),
+    ]
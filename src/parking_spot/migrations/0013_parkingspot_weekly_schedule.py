@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-18 12:01
+
+from django.db import migrations
+import src.parking_spot.fields
+import src.parking_spot.schedule
+from src.parking_spot.schedule import compile_schedule
+
+
+def populate_weekly_schedule(apps, schema_editor):
+    ParkingSpot = apps.get_model("parking_spot", "ParkingSpot")
+    ParkingSpotAvailability = apps.get_model("parking_spot", "ParkingSpotAvailability")
+
+    availabilities = {}
+    for parking_spot_id, day, start_time, end_time in (
+        ParkingSpotAvailability.objects.filter(is_active=True)
+        .values_list("parking_spot_id", "day", "start_time", "end_time")
+        .iterator()
+    ):
+        availabilities.setdefault(parking_spot_id, []).append(
+            (day, start_time, end_time)
+        )
+
+    batch = []
+    for parking_spot in ParkingSpot.objects.only("id").iterator():
+        parking_spot.weekly_schedule = compile_schedule(
+            availabilities.get(parking_spot.id, [])
+        )
+        batch.append(parking_spot)
+        if len(batch) >= 1000:
+            ParkingSpot.objects.bulk_update(batch, ["weekly_schedule"])
+            batch = []
+    ParkingSpot.objects.bulk_update(batch, ["weekly_schedule"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0012_bookingoccupancy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkingspot",
+            name="weekly_schedule",
+            field=src.parking_spot.fields.BitStringField(
+                default=src.parking_spot.schedule.always_open,
+                editable=False,
+                help_text="Opening hours as one bit per quarter hour of the week from Monday",
+                length=672,
+            ),
+        ),
+        migrations.RunPython(populate_weekly_schedule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2 on 2026-10-18 12:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("parking_spot", "0013_parkingspot_weekly_schedule"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                (
+                    "vehicle",
+                    models.CharField(
+                        choices=[
+                            ("SMALL", "Small Car"),
+                            ("MEDIUM", "Medium Car"),
+                            ("SUV", "Large Car (SUV)"),
+                            ("BIKE", "Bike"),
+                            ("TRUCK", "Truck"),
+                            ("MINIBUS", "Minibus"),
+                            ("VAN", "Van"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                ("expires_at", models.DateTimeField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "parking_spot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="parking_spot.parkingspot",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="booking_holds",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="bookinghold",
+            index=models.Index(
+                fields=["parking_spot", "vehicle", "expires_at"],
+                name="bookinghold_spot_expiry",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bookinghold",
+            index=models.Index(fields=["expires_at"], name="bookinghold_expiry"),
+        ),
+    ]
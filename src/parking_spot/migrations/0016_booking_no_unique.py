@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from src.parking_spot.constants import BOOKING_NO_DIGITS, BOOKING_NO_SEQUENCE
+
+
+def renumber_duplicate_bookings(apps, schema_editor):
+    """
+    Give every booking sharing its number with an earlier one a number from
+    the sequence, dated by when it was created.
+    """
+    Booking = apps.get_model("parking_spot", "Booking")
+
+    duplicates = (
+        Booking.objects.values("booking_no")
+        .annotate(count=Count("id"), first_id=Min("id"))
+        .filter(count__gt=1)
+    )
+    with schema_editor.connection.cursor() as cursor:
+        for duplicate in duplicates.iterator():
+            bookings = (
+                Booking.objects.filter(booking_no=duplicate["booking_no"])
+                .exclude(id=duplicate["first_id"])
+                .order_by("id")
+                .values_list("id", "created_at")
+            )
+            for booking_id, created_at in bookings:
+                cursor.execute("SELECT nextval(%s)", [BOOKING_NO_SEQUENCE])
+                (sequence,) = cursor.fetchone()
+                booking_no = (
+                    f"BOOK-{created_at:%Y%m%d}-{sequence:0{BOOKING_NO_DIGITS}d}"
+                )
+                Booking.objects.filter(id=booking_id).update(booking_no=booking_no)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_spot", "0015_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f"CREATE SEQUENCE IF NOT EXISTS {BOOKING_NO_SEQUENCE}",
+            f"DROP SEQUENCE IF EXISTS {BOOKING_NO_SEQUENCE}",
+        ),
+        migrations.RunPython(renumber_duplicate_bookings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="booking",
+            name="booking_no",
+            field=models.CharField(help_text="booking no", max_length=50, unique=True),
+        ),
+    ]
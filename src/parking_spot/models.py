@@ -1,11 +1,24 @@
+import uuid
+
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.db.models.functions import Upper
+from rest_framework.utils.encoders import JSONEncoder
 
 from src.base.models import AbstractInfoModel
+from src.parking_spot.fields import BitStringField
+from src.parking_spot.geo import geohash_encode
+from src.parking_spot.postcodes import normalize_postcode
+from src.parking_spot.schedule import SCHEDULE_SLOTS, always_open
 from django.contrib.auth import get_user_model
 
 from src.parking_spot.constants import (
     DAYS_OF_WEEK,
     FEATURE_CHOICES,
+    OCCUPYING_STATUSES,
     STATUS_CHOICES,
     VEHICLE_TYPES,
 )
@@ -22,14 +35,78 @@ class ParkingSpot(AbstractInfoModel):
     description = models.TextField()
     address = models.CharField(max_length=500, blank=True)
     postcode = models.CharField(max_length=20)
+    normalized_postcode = models.CharField(
+        max_length=20,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="Uppercased postcode with a single space, used for prefix lookups",
+    )
     latitude = models.FloatField()
     longitude = models.FloatField()
+    geohash = models.CharField(
+        max_length=12,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="Geohash cell of latitude/longitude, used to narrow radius queries",
+    )
     rate_per_hour = models.DecimalField(max_digits=10, decimal_places=2)
     rate_per_day = models.DecimalField(max_digits=10, decimal_places=2)
+    features_mask = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Bits (FEATURE_BITS) of the spot's active features",
+    )
+    vehicle_types_mask = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Bits (VEHICLE_TYPE_BITS) of the spot's active vehicle capacities",
+    )
+    weekly_schedule = BitStringField(
+        length=SCHEDULE_SLOTS,
+        default=always_open,
+        editable=False,
+        help_text="Opening hours as one bit per quarter hour of the week from Monday",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text="Weighted tsvector of name, address and description",
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                OpClass(Upper(field), name="gin_trgm_ops"),
+                name=f"parkingspot_{field}_trgm",
+            )
+            for field in ("name", "address", "postcode")
+        ] + [
+            GinIndex(fields=["search_vector"], name="parkingspot_search_vector"),
+            models.Index(
+                fields=["is_active", "features_mask", "vehicle_types_mask"],
+                name="parkingspot_active_masks",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Coordinates may still be strings when assigned from raw input
+        self.geohash = geohash_encode(float(self.latitude), float(self.longitude))
+        self.normalized_postcode = normalize_postcode(self.postcode)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            derived = set()
+            if "latitude" in update_fields or "longitude" in update_fields:
+                derived.add("geohash")
+            if "postcode" in update_fields:
+                derived.add("normalized_postcode")
+            kwargs["update_fields"] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+
 
 class ParkingSpotFeatures(models.Model):
     parking_spot = models.ForeignKey(
@@ -89,6 +166,26 @@ class ParkingSpotReview(models.Model):
         return f"Review for {self.parking_spot.name} by {self.reviewer.username}"
 
 
+class BookingQuerySet(models.QuerySet):
+    def occupying(self):
+        """Bookings that hold a place: active, and neither cancelled nor completed."""
+        return self.filter(is_active=True, status__in=OCCUPYING_STATUSES)
+
+    def overlapping(self, start_time, end_time):
+        """
+        Occupying bookings that overlap `[start_time, end_time)`. A booking
+        without an end time occupies its place from its start onwards.
+        """
+        return self.occupying().filter(
+            period__overlap=DateTimeTZRange(start_time, end_time, "[)")
+        )
+
+
+def booking_period(start_time, end_time):
+    """The `[start_time, end_time)` range stored in `Booking.period`."""
+    return DateTimeTZRange(start_time, end_time, "[)")
+
+
 class Booking(models.Model):
     parking_spot = models.ForeignKey(
         ParkingSpot, on_delete=models.CASCADE, related_name="bookings"
@@ -97,7 +194,7 @@ class Booking(models.Model):
         User, on_delete=models.PROTECT, related_name="user_bookings"
     )
     status = models.CharField(choices=STATUS_CHOICES, max_length=20, default="PENDING")
-    booking_no = models.CharField(max_length=50, help_text="booking no")
+    booking_no = models.CharField(max_length=50, unique=True, help_text="booking no")
     start_time = models.DateTimeField(help_text="Start time for booking")
     end_time = models.DateTimeField(
         null=True, blank=True, help_text="End time for booking"
@@ -114,15 +211,180 @@ class Booking(models.Model):
         max_length=50, help_text="registeration no of vehicle"
     )
     vehicle = models.CharField(choices=VEHICLE_TYPES, max_length=100)
+    period = DateTimeRangeField(
+        null=True,
+        editable=False,
+        help_text="[start_time, end_time) range, unbounded without an end time",
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookingQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=["parking_spot"]),
             models.Index(fields=["start_time"]),
+            models.Index(
+                fields=["parking_spot", "vehicle", "start_time"],
+                name="booking_spot_vehicle_start",
+            ),
+            # Only bookings that hold a place are searched for overlaps
+            GistIndex(
+                fields=["parking_spot", "vehicle", "period"],
+                name="booking_occupying_period",
+                condition=models.Q(is_active=True, status__in=OCCUPYING_STATUSES),
+            ),
         ]
 
     def __str__(self):
         return f"{self.vehicle_no} ({self.status})"
+
+    def save(self, *args, **kwargs):
+        self.period = booking_period(self.start_time, self.end_time)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and (
+            "start_time" in update_fields or "end_time" in update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, "period"}
+        super().save(*args, **kwargs)
+
+
+class ParkingSpotCluster(models.Model):
+    """
+    Precomputed map cluster: the active spots falling in one grid cell of a
+    zoom level. Kept up to date incrementally as spots change.
+    """
+
+    zoom = models.PositiveSmallIntegerField()
+    cell_x = models.IntegerField()
+    cell_y = models.IntegerField()
+    count = models.PositiveIntegerField(default=0)
+    latitude_sum = models.FloatField(default=0)
+    longitude_sum = models.FloatField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["zoom", "cell_x", "cell_y"], name="unique_cluster_cell"
+            )
+        ]
+
+    def __str__(self):
+        return f"z{self.zoom} ({self.cell_x}, {self.cell_y}): {self.count}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Counter bumped whenever a catalog changes, so that workers can tell when
+    their in-process indexes need to be rebuilt.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class SuggestionQuery(models.Model):
+    """How often a normalized search suggestion query has been asked for."""
+
+    query = models.CharField(max_length=100, unique=True)
+    count = models.PositiveBigIntegerField(default=0)
+    last_searched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.query} ({self.count})"
+
+
+class BookingOccupancy(models.Model):
+    """
+    Number of occupying bookings of a vehicle type touching one time bucket
+    of a parking spot. Kept in step with the bookings, so that checking a
+    period reads one row per bucket instead of scanning bookings.
+    """
+
+    parking_spot = models.ForeignKey(
+        ParkingSpot, on_delete=models.CASCADE, related_name="occupancy"
+    )
+    vehicle_type = models.CharField(choices=VEHICLE_TYPES, max_length=100)
+    bucket = models.DateTimeField(help_text="Start of the time bucket")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["parking_spot", "vehicle_type", "bucket"],
+                name="unique_occupancy_bucket",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.parking_spot_id} {self.vehicle_type} @ {self.bucket}: {self.count}"
+        )
+
+
+class BookingHold(models.Model):
+    """
+    A place reserved for a driver for a few minutes while they check out.
+    Counted in the occupancy ledger like a booking until it is converted into
+    one or expires.
+    """
+
+    uuid = models.UUIDField(unique=True, editable=False, default=uuid.uuid4)
+    parking_spot = models.ForeignKey(
+        ParkingSpot, on_delete=models.CASCADE, related_name="holds"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="booking_holds"
+    )
+    vehicle = models.CharField(choices=VEHICLE_TYPES, max_length=100)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["parking_spot", "vehicle", "expires_at"],
+                name="bookinghold_spot_expiry",
+            ),
+            models.Index(fields=["expires_at"], name="bookinghold_expiry"),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle} hold until {self.expires_at}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The response to a request sent with an `Idempotency-Key` header, replayed
+    when the client retries the request with the same key.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # Only ever committed together with the response they store
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(encoder=JSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_idempotency_key"
+            )
+        ]
+        indexes = [models.Index(fields=["expires_at"], name="idempotencykey_expiry")]
+
+    def __str__(self):
+        return f"{self.key} ({self.response_status})"
@@ -0,0 +1,108 @@
+import os
+import re
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+POSTCODE_DTYPE = np.dtype(
+    [("postcode", "S10"), ("latitude", "f8"), ("longitude", "f8")]
+)
+# A (partial) UK postcode: outward code such as "SW1A", optionally followed by
+# the start of the inward code
+POSTCODE_PATTERN = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?( [0-9][A-Z]{0,2})?$")
+INWARD_CODE_PATTERN = re.compile(r"[0-9][A-Z]{2}$")
+
+
+def normalize_postcode(value):
+    """
+    Uppercase the postcode and put a single space before the inward code,
+    e.g. `sw1a1aa` -> `SW1A 1AA`. Whitespace in partial postcodes is collapsed.
+    """
+    postcode = " ".join((value or "").split()).upper()
+    if (
+        " " not in postcode
+        and len(postcode) >= 5
+        and INWARD_CODE_PATTERN.search(postcode)
+    ):
+        postcode = f"{postcode[:-3]} {postcode[-3:]}"
+    return postcode
+
+
+def looks_like_postcode(value):
+    return bool(POSTCODE_PATTERN.match(normalize_postcode(value)))
+
+
+def _excludes_longer_district(prefix):
+    # "SW1" must not match "SW10 ..": an outward code ending in a digit is
+    # only continued by a letter (SW1A) or the inward code
+    return " " not in prefix and prefix[-1:].isdigit()
+
+
+def postcode_prefix_q(value, field="normalized_postcode"):
+    """Prefix match on the indexed normalized postcode column."""
+    prefix = normalize_postcode(value)
+    query = Q(**{f"{field}__startswith": prefix})
+    if _excludes_longer_district(prefix):
+        query &= ~Q(**{f"{field}__regex": rf"^{re.escape(prefix)}[0-9]"})
+    return query
+
+
+_centroids = None
+_centroids_mtime = None
+_centroids_lock = threading.Lock()
+
+
+def get_postcode_centroids():
+    """
+    The postcode -> centroid table written by `import_postcode_centroids`,
+    memory-mapped so that workers share the OS page cache instead of each
+    loading a copy. Returns `None` when no table has been imported.
+    """
+    global _centroids, _centroids_mtime
+
+    try:
+        mtime = os.stat(settings.POSTCODE_CENTROIDS_PATH).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _centroids_lock:
+        if _centroids is None or _centroids_mtime != mtime:
+            _centroids = np.load(settings.POSTCODE_CENTROIDS_PATH, mmap_mode="r")
+            _centroids_mtime = mtime
+    return _centroids
+
+
+def find_postcode_centroid(value):
+    """
+    Centroid `(latitude, longitude)` of a full postcode, or the mean centroid
+    of every postcode starting with a partial one such as an outward code.
+    Returns `None` if the value is not a known postcode.
+    """
+    if not looks_like_postcode(value):
+        return None
+    centroids = get_postcode_centroids()
+    if centroids is None:
+        return None
+
+    prefix = normalize_postcode(value)
+    key = prefix.encode()
+    postcodes = centroids["postcode"]
+    start = np.searchsorted(postcodes, key, side="left")
+    end = np.searchsorted(postcodes, key + b"\xff", side="left")
+    if start == end:
+        return None
+
+    latitudes = centroids["latitude"][start:end]
+    longitudes = centroids["longitude"][start:end]
+    if _excludes_longer_district(prefix):
+        # Postcodes are sorted, so the longer districts form one contiguous run
+        skip_start = np.searchsorted(postcodes, key + b"0", side="left") - start
+        skip_end = np.searchsorted(postcodes, key + b"9\xff", side="left") - start
+        latitudes = np.concatenate((latitudes[:skip_start], latitudes[skip_end:]))
+        longitudes = np.concatenate((longitudes[:skip_start], longitudes[skip_end:]))
+        if not len(latitudes):
+            return None
+
+    return float(latitudes.mean()), float(longitudes.mean())
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+_ONE_SECOND = timedelta(seconds=1)
+
+
+def to_cents(amounts):
+    """Integer cents of Decimal amounts with at most two decimal places."""
+    return np.fromiter((int(amount.scaleb(2)) for amount in amounts), dtype=np.int64)
+
+
+def from_cents(cents):
+    """Decimal amounts with two decimal places from integer cents."""
+    return [Decimal(int(value)).scaleb(-2) for value in cents]
+
+
+def _divide_half_even(numerator, denominator):
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    round_up = (twice > denominator) | ((twice == denominator) & (quotient % 2 == 1))
+    return quotient + round_up
+
+
+def quote_cents(hourly_cents, daily_cents, seconds):
+    """
+    Price in cents of parking for `seconds`, elementwise over arrays that
+    broadcast together.
+
+    Up to a day is charged by the hour, pro rata. Beyond that every full day
+    is charged at the daily rate and the rest by the hour. The total is
+    rounded to the cent once, half to even. All arithmetic is on integers, so
+    prices are exact and the same wherever they are computed.
+    """
+    hourly_cents, daily_cents, seconds = np.broadcast_arrays(
+        np.asarray(hourly_cents, dtype=np.int64),
+        np.asarray(daily_cents, dtype=np.int64),
+        np.asarray(seconds, dtype=np.int64),
+    )
+    days = np.where(seconds > SECONDS_PER_DAY, seconds // SECONDS_PER_DAY, 0)
+    rest = seconds - days * SECONDS_PER_DAY
+    # In 1/3600 cents, so the total is rounded once
+    total = daily_cents * days * SECONDS_PER_HOUR + hourly_cents * rest
+    return _divide_half_even(total, SECONDS_PER_HOUR)
+
+
+def _seconds(start_time, end_time):
+    # Durations are charged in whole seconds
+    return (end_time - start_time) // _ONE_SECOND
+
+
+def quote_spots(parking_spots, start_time, end_time):
+    """Price of booking each of the spots over the same period."""
+    return from_cents(
+        quote_cents(
+            to_cents(spot.rate_per_hour for spot in parking_spots),
+            to_cents(spot.rate_per_day for spot in parking_spots),
+            _seconds(start_time, end_time),
+        )
+    )
+
+
+def quote_periods(parking_spot, periods):
+    """Price of booking the spot over each `(start_time, end_time)` period."""
+    seconds = np.fromiter(
+        (_seconds(start_time, end_time) for start_time, end_time in periods),
+        dtype=np.int64,
+    )
+    return from_cents(
+        quote_cents(
+            to_cents([parking_spot.rate_per_hour])[0],
+            to_cents([parking_spot.rate_per_day])[0],
+            seconds,
+        )
+    )
@@ -1,17 +1,35 @@
+import math
+from itertools import islice
+
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
-from decimal import Decimal
 
-from src.parking_spot.utils import generate_booking_no
+from src.parking_spot.bookings import (
+    BULK_BOOKING_MAX_OCCURRENCES,
+    add_occupancy,
+    change_occupancy,
+    check_capacity,
+    check_capacity_many,
+    place_hold,
+    recurrence_windows,
+    take_hold,
+)
+from src.parking_spot.constants import DAYS_OF_WEEK, FEATURE_CHOICES, VEHICLE_TYPES
+from src.parking_spot.pricing import quote_periods
+from src.parking_spot.schedule import schedule_covers
+from src.parking_spot.utils import generate_booking_no, generate_booking_nos
 
 from ..models import (
     Booking,
+    BookingHold,
     ParkingSpot,
     ParkingSpotAvailability,
     ParkingSpotVehicleCapacity,
     ParkingSpotFeatures,
     ParkingSpotReview,
     ParkingSpotVehicleCapacity,
+    booking_period,
 )
 
 from src.user.models import User
@@ -31,6 +49,14 @@ class UserListSerializer(serializers.ModelSerializer):
 class ParkingSpotListSerializer(serializers.ModelSerializer):
     total_reviews = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
+    distance = serializers.SerializerMethodField()
+    total_price = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        read_only=True,
+        allow_null=True,
+        help_text="Price of booking the spot from start_time to end_time",
+    )
 
     class Meta:
         model = ParkingSpot
@@ -47,11 +73,19 @@ class ParkingSpotListSerializer(serializers.ModelSerializer):
             "rate_per_day",
             "total_reviews",
             "average_rating",
+            "distance",
+            "total_price",
         ]
 
     def get_total_reviews(self, obj):
         return obj.reviews.count()
 
+    def get_distance(self, obj):
+        distance = getattr(obj, "distance", None)
+        if distance is None:
+            return None
+        return round(distance, 3)
+
     def get_average_rating(self, obj):
         reviews = obj.reviews.values_list("rating", flat=True)
         total_reviews = self.get_total_reviews(obj)
@@ -61,6 +95,41 @@ class ParkingSpotListSerializer(serializers.ModelSerializer):
         return total_rating / total_reviews
 
 
+class ParkingSpotRouteSerializer(ParkingSpotListSerializer):
+    route_position = serializers.SerializerMethodField()
+
+    class Meta(ParkingSpotListSerializer.Meta):
+        fields = ParkingSpotListSerializer.Meta.fields + ["route_position"]
+
+    def get_route_position(self, obj):
+        return round(obj.route_position, 3)
+
+
+def validate_finite(value):
+    # nan passes the min/max validators, and nan or inf cannot be rendered
+    if not math.isfinite(value):
+        raise serializers.ValidationError("A valid number is required.")
+
+
+class DistanceMatrixOriginSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(
+        min_value=-90, max_value=90, validators=[validate_finite]
+    )
+    longitude = serializers.FloatField(
+        min_value=-180, max_value=180, validators=[validate_finite]
+    )
+
+
+class ParkingSpotDistanceMatrixSerializer(serializers.Serializer):
+    origins = DistanceMatrixOriginSerializer(many=True, min_length=1, max_length=100)
+    k = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    radius = serializers.FloatField(
+        min_value=0, required=False, validators=[validate_finite]
+    )
+    vehicle_types = serializers.MultipleChoiceField(choices=VEHICLE_TYPES, required=False)
+    features = serializers.MultipleChoiceField(choices=FEATURE_CHOICES, required=False)
+
+
 class ParkingSpotFeaturesSerializer(serializers.ModelSerializer):
     feature = serializers.CharField(source="get_feature_display")
 
@@ -139,7 +208,49 @@ class ParkingSpotReviewCreateSerializer(serializers.ModelSerializer):
         fields = ["parking_spot", "rating", "comments"]
 
 
+def validate_booking_period(data):
+    """Checks shared by bookings and holds of a spot over a period."""
+    if not data["parking_spot"].is_active:
+        raise serializers.ValidationError(
+            "The selected parking spot is not available."
+        )
+
+    if data["start_time"] < timezone.now():
+        raise serializers.ValidationError("Start time must be in the future.")
+
+    if data["end_time"] <= data["start_time"]:
+        raise serializers.ValidationError("End time must be after the start time.")
+
+    if not schedule_covers(
+        data["parking_spot"].weekly_schedule, data["start_time"], data["end_time"]
+    ):
+        raise serializers.ValidationError(
+            "The parking spot is not open for the whole booking."
+        )
+
+
+class BookingHoldCreateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookingHold
+        fields = ["uuid", "parking_spot", "vehicle", "start_time", "end_time", "expires_at"]
+        read_only_fields = ["uuid", "expires_at"]
+
+    def validate(self, data):
+        validate_booking_period(data)
+        return data
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            return place_hold(**validated_data)
+
+
 class BookingCreateSerializer(serializers.ModelSerializer):
+    hold = serializers.UUIDField(
+        write_only=True,
+        required=False,
+        help_text="A hold from create-booking-hold to convert into this booking",
+    )
+
     class Meta:
         model = Booking
         fields = [
@@ -149,49 +260,174 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             "amount",
             "vehicle_no",
             "vehicle",
+            "hold",
         ]
 
     def validate(self, data):
-        if not data["parking_spot"].is_active:
+        validate_booking_period(data)
+
+        (calculated_amount,) = quote_periods(
+            data["parking_spot"], [(data["start_time"], data["end_time"])]
+        )
+
+        if data["amount"] != calculated_amount:
             raise serializers.ValidationError(
-                "The selected parking spot is not available."
+                f"Incorrect amount. The correct amount should be {calculated_amount:.2f}."
             )
 
-        if data["start_time"] < timezone.now():
-            raise serializers.ValidationError("Start time must be in the future.")
+        return data
 
-        if data["end_time"] <= data["start_time"]:
-            raise serializers.ValidationError("End time must be after the start time.")
+    def create(self, validated_data):
+        hold = validated_data.pop("hold", None)
+        period = (
+            validated_data["parking_spot"],
+            validated_data["vehicle"],
+            validated_data["start_time"],
+            validated_data["end_time"],
+        )
+        with transaction.atomic():
+            if hold is not None:
+                # The hold's place passes to the booking as it is
+                take_hold(hold, validated_data["user"], *period)
+            else:
+                # Locks the capacity rows until the booking is saved, so two
+                # drivers cannot both take the last place
+                check_capacity(*period)
+            # Generate a unique booking number
+            validated_data["booking_no"] = generate_booking_no()
+            booking = super().create(validated_data)
+            if hold is None:
+                change_occupancy(booking, 1)
+            return booking
+
+
+class BookingWindowSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+
+
+class BookingRecurrenceSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField(help_text="Last day to book, inclusive")
+    days = serializers.MultipleChoiceField(choices=DAYS_OF_WEEK)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField(
+        help_text="Ends the next day when at or before the start time"
+    )
+
+    def validate(self, data):
+        if data["end_date"] < data["start_date"]:
+            raise serializers.ValidationError(
+                "End date must not be before the start date."
+            )
+        if not data["days"]:
+            raise serializers.ValidationError({"days": "Choose at least one day."})
+        return data
 
-        parking_spot = data["parking_spot"]
-        rate_per_hour = parking_spot.rate_per_hour
-        rate_per_day = parking_spot.rate_per_day
-
-        # Calculate the booking duration in hours
-        duration_seconds = (data["end_time"] - data["start_time"]).total_seconds()
-        duration_hours = Decimal(duration_seconds) / Decimal(3600) 
-        
-        # Calculate the expected amount
-        if duration_hours <= 24:
-            calculated_amount = rate_per_hour * duration_hours
-        else:
-            calculated_amount = rate_per_day * (duration_hours // 24)
-            remaining_hours = duration_hours % 24
-            if remaining_hours > 0:
-                calculated_amount += rate_per_hour * remaining_hours
 
-        calculated_amount = round(calculated_amount, 2)
+class BulkBookingCreateSerializer(serializers.Serializer):
+    """
+    Books one spot for many windows at once, given either as a list or as a
+    weekly recurrence. Either every booking is created or none is.
+    """
+
+    parking_spot = serializers.PrimaryKeyRelatedField(
+        queryset=ParkingSpot.objects.all()
+    )
+    vehicle = serializers.ChoiceField(choices=VEHICLE_TYPES)
+    vehicle_no = serializers.CharField(max_length=50)
+    amount = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        help_text="Total amount of all the bookings",
+    )
+    windows = BookingWindowSerializer(many=True, required=False)
+    recurrence = BookingRecurrenceSerializer(required=False)
 
+    def validate(self, data):
+        if ("windows" in data) == ("recurrence" in data):
+            raise serializers.ValidationError(
+                "Provide either a list of windows or a recurrence."
+            )
+
+        if "recurrence" in data:
+            periods = list(
+                islice(
+                    recurrence_windows(**data.pop("recurrence")),
+                    BULK_BOOKING_MAX_OCCURRENCES + 1,
+                )
+            )
+        else:
+            periods = [
+                (window["start_time"], window["end_time"])
+                for window in data.pop("windows")
+            ]
+        if not periods:
+            raise serializers.ValidationError("There is nothing to book.")
+        if len(periods) > BULK_BOOKING_MAX_OCCURRENCES:
+            raise serializers.ValidationError(
+                f"At most {BULK_BOOKING_MAX_OCCURRENCES} bookings can be made at once."
+            )
+
+        periods.sort()
+        parking_spot = data["parking_spot"]
+        for start_time, end_time in periods:
+            try:
+                validate_booking_period(
+                    {
+                        "parking_spot": parking_spot,
+                        "start_time": start_time,
+                        "end_time": end_time,
+                    }
+                )
+            except serializers.ValidationError as error:
+                raise serializers.ValidationError(
+                    f"Booking from {start_time:%Y-%m-%d %H:%M}: {error.detail[0]}"
+                )
+
+        amounts = quote_periods(parking_spot, periods)
+        calculated_amount = sum(amounts)
         if data["amount"] != calculated_amount:
             raise serializers.ValidationError(
                 f"Incorrect amount. The correct amount should be {calculated_amount:.2f}."
             )
 
+        data["occurrences"] = [
+            (start_time, end_time, amount)
+            for (start_time, end_time), amount in zip(periods, amounts)
+        ]
         return data
 
     def create(self, validated_data):
-        # Generate a unique booking number
-        validated_data["booking_no"] = generate_booking_no(
-            validated_data["parking_spot"].id
-        )
-        return super().create(validated_data)
+        parking_spot = validated_data["parking_spot"]
+        vehicle = validated_data["vehicle"]
+        occurrences = validated_data["occurrences"]
+        with transaction.atomic():
+            # One ledger read for every occurrence, under the capacity lock
+            bucket_counts = check_capacity_many(
+                parking_spot,
+                vehicle,
+                [(start_time, end_time) for start_time, end_time, _ in occurrences],
+            )
+            booking_nos = generate_booking_nos(len(occurrences))
+            bookings = Booking.objects.bulk_create(
+                [
+                    Booking(
+                        parking_spot=parking_spot,
+                        user=validated_data["user"],
+                        booking_no=booking_no,
+                        start_time=start_time,
+                        end_time=end_time,
+                        # `bulk_create` skips `save`, which sets the period
+                        period=booking_period(start_time, end_time),
+                        amount=amount,
+                        vehicle=vehicle,
+                        vehicle_no=validated_data["vehicle_no"],
+                    )
+                    for booking_no, (start_time, end_time, amount) in zip(
+                        booking_nos, occurrences
+                    )
+                ]
+            )
+            add_occupancy(parking_spot, vehicle, bucket_counts)
+            return bookings
@@ -2,7 +2,15 @@ from django.urls import path
 
 from .views import (
     BookingCreateAPIView,
+    BookingHoldCreateAPIView,
+    BulkBookingCreateAPIView,
+    ParkingSpotAlongRouteAPIView,
+    ParkingSpotAvailableAPIView,
+    ParkingSpotCalendarAPIView,
+    ParkingSpotDistanceMatrixAPIView,
+    ParkingSpotFacetsAPIView,
     ParkingSpotListAPIView,
+    ParkingSpotMapAPIView,
     ParkingSpotRetrieveAPIView,
     SearchSuggestionsAPIView,
     ParkingSpotReviewCreateAPIView,
@@ -10,11 +18,41 @@ from .views import (
 
 urlpatterns = [
     path("parking-spots", ParkingSpotListAPIView.as_view(), name="parking_spots"),
+    path(
+        "parking-spots/available",
+        ParkingSpotAvailableAPIView.as_view(),
+        name="parking_spots_available",
+    ),
+    path(
+        "parking-spots/facets",
+        ParkingSpotFacetsAPIView.as_view(),
+        name="parking_spots_facets",
+    ),
+    path(
+        "parking-spots/map",
+        ParkingSpotMapAPIView.as_view(),
+        name="parking_spots_map",
+    ),
+    path(
+        "parking-spots/along-route",
+        ParkingSpotAlongRouteAPIView.as_view(),
+        name="parking_spots_along_route",
+    ),
+    path(
+        "parking-spots/distance-matrix",
+        ParkingSpotDistanceMatrixAPIView.as_view(),
+        name="parking_spots_distance_matrix",
+    ),
     path(
         "parking-spots/<uuid:uuid>",
         ParkingSpotRetrieveAPIView.as_view(),
         name="parking_spot",
     ),
+    path(
+        "parking-spots/<uuid:uuid>/calendar",
+        ParkingSpotCalendarAPIView.as_view(),
+        name="parking_spot_calendar",
+    ),
     path(
         "search-suggestions",
         SearchSuggestionsAPIView.as_view(),
@@ -25,5 +63,15 @@ urlpatterns = [
         ParkingSpotReviewCreateAPIView.as_view(),
         name="create_review",
     ),
+    path(
+        "create-booking-hold",
+        BookingHoldCreateAPIView.as_view(),
+        name="create_booking_hold",
+    ),
     path("create-booking", BookingCreateAPIView.as_view(), name="create_booking"),
+    path(
+        "create-bulk-booking",
+        BulkBookingCreateAPIView.as_view(),
+        name="create_bulk_booking",
+    ),
 ]
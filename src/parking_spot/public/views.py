@@ -1,22 +1,128 @@
+from datetime import timedelta
+
+import numpy as np
 from rest_framework import generics
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters import rest_framework as filters
+from django_filters.fields import IsoDateTimeField
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
 from rest_framework.permissions import AllowAny
-from django.db.models import Q, Avg
+from django.db.models import (
+    Avg,
+    Count,
+    Exists,
+    F,
+    FloatField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from src.parking_spot.constants import FEATURE_CHOICES, VEHICLE_TYPES
+from src.parking_spot.autocomplete import suggest
+from src.parking_spot.availability import free_windows, opening_windows
+from src.parking_spot.bookings import bucket_start, unreleased_holds
+from src.parking_spot.clustering import (
+    MAP_CLUSTER_MAX_ZOOM,
+    cluster_spots,
+    clustered_spots,
+    parse_viewport,
+    precomputed_clusters,
+    viewport_q,
+    viewport_spots,
+)
+from src.parking_spot.facets import (
+    FACET_CACHE_TIMEOUT,
+    facet_cache_key,
+    facet_counts,
+)
+from src.parking_spot.constants import (
+    FEATURE_BITS,
+    FEATURE_CHOICES,
+    VEHICLE_TYPE_BITS,
+    VEHICLE_TYPES,
+)
+from src.parking_spot.spatial_index import get_spatial_index
+from src.parking_spot.utils import bitmask
+from src.parking_spot.idempotency import respond_idempotently
+from src.parking_spot.pricing import quote_spots
+from src.parking_spot.geo import (
+    bounding_box,
+    bounding_box_q,
+    decode_polyline,
+    distance_expression,
+    geohash_cells_covering,
+    geohash_cells_q,
+    parse_origin,
+    parse_radius,
+    project_onto_route,
+    route_boxes,
+)
+from src.libs.filters import FullTextSearchFilter, TrigramSearchFilter
+from src.parking_spot.schedule import SCHEDULE_SLOT, filter_open
+from src.parking_spot.search import SEARCH_CONFIG
+from src.parking_spot.suggestions import (
+    SUGGESTION_LIMIT,
+    cached_suggestions,
+    normalize_query,
+    record_query,
+)
+from src.parking_spot.postcodes import (
+    find_postcode_centroid,
+    looks_like_postcode,
+    postcode_prefix_q,
+)
 from .serializers import (
     BookingCreateSerializer,
+    BookingHoldCreateSerializer,
+    BulkBookingCreateSerializer,
+    ParkingSpotDistanceMatrixSerializer,
     ParkingSpotListSerializer,
+    ParkingSpotRouteSerializer,
     ParkingSpotDetailSerializer,
     ParkingSpotReviewCreateSerializer,
 )
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+
+from ..models import (
+    Booking,
+    BookingHold,
+    BookingOccupancy,
+    ParkingSpot,
+    ParkingSpotReview,
+    ParkingSpotVehicleCapacity,
+)
+
+# Default radius (km) of a search for a postcode
+POSTCODE_SEARCH_RADIUS = 5
+# Corridor half-width (km) around a route, default and maximum
+ROUTE_CORRIDOR_WIDTH = 0.5
+ROUTE_MAX_CORRIDOR_WIDTH = 10
+ROUTE_MAX_POINTS = 5000
+# Spatial index candidates fetched per wanted spot of a filtered distance matrix
+DISTANCE_MATRIX_CANDIDATES = 4
+# Nearest spots whose names/addresses are matched for location-aware suggestions
+SUGGESTION_NEAREST_CANDIDATES = 500
+# First ring (km) of an availability search, and how far it widens by default
+AVAILABLE_FIRST_RING = 1
+AVAILABLE_MAX_RADIUS = 50
+# Days covered by the free-slot calendar, default and maximum
+CALENDAR_DAYS = 7
+CALENDAR_MAX_DAYS = 31
+
 
-from ..models import Booking, ParkingSpot, ParkingSpotReview
+class DateTimeRangeFilter(filters.BaseRangeFilter, filters.IsoDateTimeFilter):
+    pass
 
 
 class ParkingSpotFilter(filters.FilterSet):
@@ -26,32 +132,129 @@ class ParkingSpotFilter(filters.FilterSet):
     features = filters.MultipleChoiceFilter(
         choices=FEATURE_CHOICES, method="filter_by_features", label="Features"
     )
+    start_time = filters.IsoDateTimeFilter(
+        method="filter_by_window", label="Start Time"
+    )
+    end_time = filters.IsoDateTimeFilter(method="filter_by_window", label="End Time")
+    open_at = filters.IsoDateTimeFilter(method="filter_by_open_at", label="Open At")
+    open_between = DateTimeRangeFilter(
+        method="filter_by_open_between", label="Open Between (start,end)"
+    )
 
     class Meta:
         model = ParkingSpot
-        fields = ["vehicle_types", "features"]
+        fields = [
+            "vehicle_types",
+            "features",
+            "start_time",
+            "end_time",
+            "open_at",
+            "open_between",
+        ]
 
-    def filter_by_vehicle_types(self, queryset, name, value):
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        start_time = self.form.cleaned_data.get("start_time")
+        end_time = self.form.cleaned_data.get("end_time")
+        if start_time is None and end_time is None:
+            return queryset
+        if start_time is None:
+            raise ValidationError({"start_time": "Required along with end_time."})
+        if end_time is None:
+            raise ValidationError({"end_time": "Required along with start_time."})
+        if end_time <= start_time:
+            raise ValidationError({"end_time": "Must be after start_time."})
+
+        return self.filter_by_free_capacity(
+            queryset, self.form.cleaned_data.get("vehicle_types"), start_time, end_time
+        )
+
+    def filter_by_open_at(self, queryset, name, value):
+        """Spots open at the given time, read from their weekly schedule bitset."""
+        return filter_open(queryset, value, value + SCHEDULE_SLOT)
+
+    def filter_by_open_between(self, queryset, name, value):
+        """Spots open for the whole of the given `start,end` period."""
+        if len(value) != 2 or value[1] <= value[0]:
+            raise ValidationError(
+                {"open_between": "Expected `start,end` with start before end."}
+            )
+        return filter_open(queryset, *value)
+
+    def filter_by_window(self, queryset, name, value):
+        # Applied in `filter_queryset`, where both ends of the window are known
+        return queryset
+
+    @staticmethod
+    def filter_by_free_capacity(queryset, vehicle_types, start_time, end_time):
         """
-        Custom filter to return parking spots with the given vehicle type.
+        Spots with a free place over the window for every given vehicle type
+        (for any type if none are given): the type's capacity must exceed its
+        busiest occupancy ledger bucket in the window, not counting expired
+        holds that are yet to be released. Evaluated as correlated subqueries
+        of the spot query rather than per spot.
         """
-        # FIXME filter by available capacity
-        # return queryset.filter(
-        #     Q(vehicles_capacity__vehicle_type=value)
-        #     & Q(vehicles_capacity__capacity__gt=0)
-        # )
-        for vehicle_type in value:
-            queryset = queryset.filter(vehicles_capacity__vehicle_type=vehicle_type)
+        expired = (
+            unreleased_holds(
+                OuterRef("parking_spot"), OuterRef("vehicle_type"), OuterRef("bucket")
+            )
+            .order_by()
+            .values("vehicle")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        peak = (
+            BookingOccupancy.objects.filter(
+                parking_spot=OuterRef("parking_spot"),
+                vehicle_type=OuterRef("vehicle_type"),
+                bucket__gte=bucket_start(start_time),
+                bucket__lt=end_time,
+            )
+            .order_by()
+            .values("parking_spot")
+            .annotate(peak=Max(F("count") - Coalesce(Subquery(expired), 0)))
+            .values("peak")
+        )
+        free = (
+            ParkingSpotVehicleCapacity.objects.filter(
+                parking_spot=OuterRef("pk"), is_active=True
+            )
+            .annotate(booked=Coalesce(Subquery(peak), 0))
+            .filter(capacity__gt=F("booked"))
+        )
+
+        if not vehicle_types:
+            return queryset.filter(Exists(free))
+        for vehicle_type in vehicle_types:
+            queryset = queryset.filter(Exists(free.filter(vehicle_type=vehicle_type)))
+        return queryset
 
-        return queryset.distinct()
+    def filter_by_vehicle_types(self, queryset, name, value):
+        """
+        Custom filter to return parking spots that take all the given vehicle types.
+        With `start_time`/`end_time`, their free capacity is checked as well.
+        """
+        return self.filter_by_mask(
+            queryset, "vehicle_types_mask", bitmask(value, VEHICLE_TYPE_BITS)
+        )
 
     def filter_by_features(self, queryset, name, value):
         """
         Custom filter to return parking spots that contain all specified features.
         """
-        for feature in value:
-            queryset = queryset.filter(features__feature=feature)
-        return queryset.distinct()
+        return self.filter_by_mask(
+            queryset, "features_mask", bitmask(value, FEATURE_BITS)
+        )
+
+    @staticmethod
+    def filter_by_mask(queryset, field, wanted):
+        """Spots whose mask has every bit of `wanted` set, without any join."""
+        if not wanted:
+            return queryset
+        return queryset.alias(**{f"{field}_wanted": F(field).bitand(wanted)}).filter(
+            **{f"{field}_wanted": wanted}
+        )
 
 
 class ParkingSpotListAPIView(generics.ListAPIView):
@@ -60,52 +263,639 @@ class ParkingSpotListAPIView(generics.ListAPIView):
     )
     serializer_class = ParkingSpotListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, OrderingFilter, SearchFilter]
+    filter_backends = [
+        DjangoFilterBackend,
+        OrderingFilter,
+        TrigramSearchFilter,
+        FullTextSearchFilter,
+    ]
     filterset_class = ParkingSpotFilter
     ordering_fields = ["rate_per_hour", "average_rating", "distance"]
     ordering = ["name"]
     search_fields = ["name", "address", "postcode"]
+    search_vector_field = "search_vector"
+    search_config = SEARCH_CONFIG
+    # Set per request to a `Q` that the search also matches on
+    search_alternative_q = None
+
+    # Query params that can be answered by the spatial index alone
+    SPATIAL_INDEX_PARAMS = {
+        "latitude",
+        "longitude",
+        "radius",
+        "limit",
+        "offset",
+        "ordering",
+    }
+
+    def get_origin(self):
+        """
+        The `(latitude, longitude, radius)` to search around: the given
+        coordinates or, failing those, the centroid of a postcode `search`.
+        """
+        if not hasattr(self, "_origin"):
+            self._origin = parse_origin(self.request.query_params)
+            if self._origin is None:
+                self._origin = self.get_postcode_origin()
+        return self._origin
+
+    def get_postcode_origin(self):
+        search = self.request.query_params.get("search", "").strip()
+        centroid = find_postcode_centroid(search) if search else None
+        if centroid is None:
+            return None
+
+        # The postcode is turned into a proximity search, not a text match
+        self.search_fields = None
+        radius = parse_radius(self.request.query_params) or POSTCODE_SEARCH_RADIUS
+        return (*centroid, radius)
+
+    def list(self, request, *args, **kwargs):
+        origin = self.get_origin()
+        index_params = self.SPATIAL_INDEX_PARAMS
+        if self.search_fields is None:
+            index_params = index_params | {"search"}
+        if (
+            origin is None
+            or not set(request.query_params) <= index_params
+            or request.query_params.get("ordering", "distance") != "distance"
+        ):
+            return super().list(request, *args, **kwargs)
+        return self.list_nearest(request, *origin)
+
+    def get_quote_window(self):
+        """The `start_time`, `end_time` to price the spots for, if both were given."""
+        field = IsoDateTimeField(required=False)
+        try:
+            start_time = field.clean(self.request.query_params.get("start_time"))
+            end_time = field.clean(self.request.query_params.get("end_time"))
+        except DjangoValidationError:
+            return None
+        if start_time is None or end_time is None or end_time <= start_time:
+            return None
+        return start_time, end_time
+
+    def get_serializer(self, *args, **kwargs):
+        # Every spot of a page is priced for the window in one vectorized call
+        if kwargs.get("many") and args:
+            window = self.get_quote_window()
+            if window is not None:
+                spots = args[0]
+                for spot, price in zip(spots, quote_spots(spots, *window)):
+                    spot.total_price = price
+        return super().get_serializer(*args, **kwargs)
+
+    def list_nearest(self, request, latitude, longitude, radius):
+        """
+        Plain "near me" listing: the worker's spatial index finds the page of
+        nearest ids and the database only loads those spots.
+        """
+        paginator = self.paginator
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        paginator.offset = paginator.get_offset(request)
+        end = paginator.offset + paginator.limit
+
+        index = get_spatial_index()
+        if radius is not None:
+            ids, distances = index.query_radius(latitude, longitude, radius)
+            paginator.count = len(ids)
+        else:
+            ids, distances = index.nearest(latitude, longitude, end)
+            paginator.count = len(index)
+
+        page_ids = ids[paginator.offset : end].tolist()
+        spots = self.queryset.in_bulk(page_ids)
+        page = []
+        for spot_id, distance in zip(page_ids, distances[paginator.offset : end]):
+            # Spots deactivated since the index was built are skipped
+            if spot_id in spots:
+                spots[spot_id].distance = float(distance)
+                page.append(spots[spot_id])
+
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def get_queryset(self):
         """
         Overrides the queryset to calculate distance based on query params.
+
+        When `latitude`/`longitude` are given, every spot is annotated with its
+        great-circle `distance` (km) from that origin and results default to
+        nearest first. An optional `radius` (km) first narrows the rows to the
+        neighbouring geohash cells and a latitude/longitude bounding box, then
+        drops anything beyond the exact distance.
+
+        A `search` for a known postcode (or outward code such as "SW1") becomes
+        a proximity search around its centroid; other postcode-shaped searches
+        match by name or address as usual, or by postcode prefix.
         """
         queryset = super().get_queryset()
-        latitude = self.request.query_params.get("latitude")
-        longitude = self.request.query_params.get("longitude")
+        origin = self.get_origin()
 
-        if latitude and longitude:
-            return queryset
-            # try:
-            #     latitude = float(latitude)
-            #     longitude = float(longitude)
+        if origin is None:
+            search = self.request.query_params.get("search", "").strip()
+            if search and looks_like_postcode(search):
+                # No known centroid: the search also matches the postcode
+                # prefix on its index, as short codes ("A1", "N1") are often
+                # words of names and addresses too
+                self.search_alternative_q = postcode_prefix_q(search)
+            return queryset.annotate(distance=Value(None, output_field=FloatField()))
 
-            #     # Haversine Formula for calculating distance
-            #     queryset = queryset.annotate(distance=5.5)
+        latitude, longitude, radius = origin
+        if radius is not None:
+            cells = geohash_cells_covering(latitude, longitude, radius)
+            if cells:
+                queryset = queryset.filter(geohash_cells_q(cells))
+            queryset = queryset.filter(
+                bounding_box_q(*bounding_box(latitude, longitude, radius))
+            )
 
-            # except ValueError:
-            #     pass
+        queryset = queryset.annotate(distance=distance_expression(latitude, longitude))
+        if radius is not None:
+            queryset = queryset.filter(distance__lte=radius)
 
+        self.ordering = ["distance", "name"]
         return queryset
 
 
+class ParkingSpotAvailableAPIView(ParkingSpotListAPIView):
+    """
+    Spots near a location that can be booked for a period, nearest first.
+
+    Query Parameters:
+        latitude, longitude (float): Where to search around.
+        start_time, end_time (datetime): The period to book.
+        radius (float, optional): How far (km) to search at most.
+        vehicle_types, features: Same filters as the parking spot list.
+
+    A spot is returned when its weekly schedule is open for the whole period
+    and it has a free place for every requested vehicle type. The search starts with the spots
+    closest to the origin and widens in rings of doubling radius, stopping
+    as soon as the page is filled, so `count` is the number of spots found in
+    the `radius` (km) searched so far. Each spot carries the `total_price` of
+    booking it for the period.
+    """
+
+    def list(self, request, *args, **kwargs):
+        origin = parse_origin(request.query_params)
+        if origin is None:
+            raise ValidationError({"latitude": "latitude and longitude are required."})
+        for name in ("start_time", "end_time"):
+            if not request.query_params.get(name):
+                raise ValidationError({name: "This field is required."})
+        latitude, longitude, radius = origin
+        max_radius = radius or AVAILABLE_MAX_RADIUS
+
+        paginator = self.paginator
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        paginator.offset = paginator.get_offset(request)
+        # One more than the page, to tell whether there is a next page
+        wanted = paginator.offset + paginator.limit + 1
+
+        ids, distances = get_spatial_index().query_radius(
+            latitude, longitude, max_radius
+        )
+        found = []
+        inner, outer = 0, min(AVAILABLE_FIRST_RING, max_radius)
+        while True:
+            start = np.searchsorted(distances, inner, side="right") if inner else 0
+            end = np.searchsorted(distances, outer, side="right")
+            found.extend(self.available_spots(ids[start:end], distances[start:end]))
+            if len(found) >= wanted or outer >= max_radius:
+                break
+            inner, outer = outer, min(outer * 2, max_radius)
+
+        paginator.count = len(found)
+        page = found[paginator.offset : paginator.offset + paginator.limit]
+        response = paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+        response.data["radius"] = outer
+        return response
+
+    def available_spots(self, ids, distances):
+        """The bookable spots of one ring, in the order of `ids`."""
+        if not len(ids):
+            return []
+
+        filterset = self.filterset_class(
+            self.request.query_params,
+            queryset=self.queryset.filter(id__in=ids.tolist()),
+            request=self.request,
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        start_time = filterset.form.cleaned_data["start_time"]
+        end_time = filterset.form.cleaned_data["end_time"]
+        spots = filter_open(filterset.qs, start_time, end_time).in_bulk()
+
+        available = []
+        for spot_id, distance in zip(ids.tolist(), distances.tolist()):
+            if spot_id in spots:
+                spots[spot_id].distance = distance
+                available.append(spots[spot_id])
+        return available
+
+
+class ParkingSpotFacetsAPIView(ParkingSpotListAPIView):
+    """
+    Result counts for the filter and search state of the parking spot list.
+
+    Accepts the same query params as the list and returns, in one response,
+    the total `count`, the count per feature, per vehicle type and per hourly
+    rate bucket. Counts come from a single aggregate query and are cached
+    briefly per normalized set of params.
+
+    Example Response:
+        HTTP 200 OK
+        {
+            "count": 42,
+            "features": {"CCTV": 30, "EV_CHARGING": 4, ...},
+            "vehicleTypes": {"SMALL": 40, "SUV": 12, ...},
+            "priceBuckets": [{"min": 0, "max": 2, "count": 9}, ...]
+        }
+    """
+
+    queryset = ParkingSpot.objects.filter(is_active=True)
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, FullTextSearchFilter]
+
+    # Query params that do not change which spots are counted
+    IGNORED_PARAMS = {"limit", "offset", "ordering"}
+
+    def list(self, request, *args, **kwargs):
+        key = facet_cache_key(request.query_params, self.IGNORED_PARAMS)
+        facets = cache.get(key)
+        if facets is None:
+            facets = facet_counts(self.filter_queryset(self.get_queryset()))
+            cache.set(key, facets, FACET_CACHE_TIMEOUT)
+        return Response(facets)
+
+
+class ParkingSpotMapAPIView(APIView):
+    """
+    Compact markers for the map viewport.
+
+    Query Parameters:
+        bbox (str): Viewport as `west,south,east,north`.
+        zoom (int): Map zoom level.
+        vehicle_types, features, start_time, end_time: Same filters as the parking
+            spot list.
+
+    Up to zoom level `MAP_CLUSTER_MAX_ZOOM` the spots are clustered server-side
+    into grid cells, each returned as `[count, latitude, longitude, min_price]`.
+    Unfiltered requests are served from the precomputed cluster pyramid; with
+    filters the cells are aggregated on the fly. Above that zoom, individual
+    spots are returned as `[uuid, latitude, longitude, rate_per_hour]`.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        viewport, zoom = parse_viewport(request.query_params)
+        filtered = any(
+            name in request.query_params for name in ParkingSpotFilter.base_filters
+        )
+
+        if zoom <= MAP_CLUSTER_MAX_ZOOM and not filtered:
+            return Response(
+                {"zoom": zoom, "clusters": precomputed_clusters(zoom, *viewport)}
+            )
+
+        filterset = ParkingSpotFilter(
+            request.query_params, queryset=clustered_spots(), request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        queryset = filterset.qs.filter(viewport_q(*viewport))
+
+        if zoom <= MAP_CLUSTER_MAX_ZOOM:
+            return Response({"zoom": zoom, "clusters": cluster_spots(queryset, zoom)})
+        return Response({"zoom": zoom, "spots": viewport_spots(queryset)})
+
+
+class ParkingSpotAlongRouteAPIView(generics.ListAPIView):
+    """
+    Active spots within a corridor around a route, ordered by where they lie
+    along it.
+
+    Query Parameters:
+        polyline (str): The route as an encoded polyline.
+        width (float, optional): Maximum distance (km) of a spot from the route.
+        vehicle_types, features, start_time, end_time: Same filters as the parking
+            spot list.
+
+    Each result carries its `distance` (km) from the route and its
+    `route_position` (km from the start of the route).
+    """
+
+    queryset = ParkingSpot.objects.filter(is_active=True)
+    serializer_class = ParkingSpotRouteSerializer
+    permission_classes = [AllowAny]
+
+    def get_route(self):
+        encoded = self.request.query_params.get("polyline", "")
+        route = decode_polyline(encoded) if encoded else []
+        if not route:
+            raise ValidationError({"polyline": "An encoded polyline is required."})
+        if len(route) > ROUTE_MAX_POINTS:
+            raise ValidationError(
+                {"polyline": f"Routes are limited to {ROUTE_MAX_POINTS} points."}
+            )
+        return route
+
+    def get_width(self):
+        width = self.request.query_params.get("width")
+        if not width:
+            return ROUTE_CORRIDOR_WIDTH
+        try:
+            width = float(width)
+        except ValueError:
+            raise ValidationError({"width": "A valid number is required."}) from None
+        if not 0 < width <= ROUTE_MAX_CORRIDOR_WIDTH:
+            raise ValidationError(
+                {"width": f"Must be between 0 and {ROUTE_MAX_CORRIDOR_WIDTH} km."}
+            )
+        return width
+
+    def list(self, request, *args, **kwargs):
+        route = self.get_route()
+        width = self.get_width()
+
+        corridor = Q()
+        for box in route_boxes(route, width):
+            corridor |= bounding_box_q(*box)
+        filterset = ParkingSpotFilter(
+            request.query_params, queryset=self.get_queryset(), request=request
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        candidates = filterset.qs.filter(corridor)
+
+        ids, latitudes, longitudes = [], [], []
+        for spot_id, latitude, longitude in candidates.values_list(
+            "id", "latitude", "longitude"
+        ):
+            ids.append(spot_id)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+
+        distances, positions = project_onto_route(route, latitudes, longitudes)
+        matches = sorted(
+            (position, spot_id, distance)
+            for spot_id, distance, position in zip(ids, distances, positions)
+            if distance <= width
+        )
+
+        page = self.paginate_queryset(matches)
+        spots = self.get_queryset().in_bulk([spot_id for _, spot_id, _ in page])
+        results = []
+        for position, spot_id, distance in page:
+            spot = spots[spot_id]
+            spot.distance = float(distance)
+            spot.route_position = float(position)
+            results.append(spot)
+
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ParkingSpotDistanceMatrixAPIView(APIView):
+    """
+    Nearest spots for many origins in one request.
+
+    Takes a list of `origins` (latitude/longitude), `k`, an optional `radius`
+    (km) and the list filters (`vehicle_types`, `features`). Each origin's
+    nearest spots come from the worker's spatial index; the candidates of all
+    origins are then checked against the filters in one query. Origins left
+    with fewer than `k` matches are retried with twice as many candidates.
+    The `k` nearest spots are returned per origin, in the order the origins
+    were given.
+    """
+
+    permission_classes = [AllowAny]
+    serializer_class = ParkingSpotDistanceMatrixSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        origins = data["origins"]
+        radius = data.get("radius")
+        k = data["k"]
+        filter_data = {
+            "vehicle_types": list(data.get("vehicle_types", [])),
+            "features": list(data.get("features", [])),
+        }
+        filtered = any(filter_data.values())
+
+        index = get_spatial_index()
+        nearest = [None] * len(origins)
+        pending = list(range(len(origins)))
+        wanted = k * DISTANCE_MATRIX_CANDIDATES if filtered else k
+        matching, checked = set(), set()
+        while pending:
+            candidates = {
+                position: index.nearest(
+                    origins[position]["latitude"],
+                    origins[position]["longitude"],
+                    wanted,
+                    radius,
+                )
+                for position in pending
+            }
+
+            # Also drops spots deactivated since the index was built
+            unchecked = {
+                spot_id for ids, _ in candidates.values() for spot_id in ids.tolist()
+            } - checked
+            if unchecked:
+                filterset = ParkingSpotFilter(
+                    filter_data,
+                    queryset=ParkingSpot.objects.filter(
+                        is_active=True, id__in=unchecked
+                    ),
+                )
+                if not filterset.is_valid():
+                    raise translate_validation(filterset.errors)
+                matching.update(filterset.qs.values_list("id", flat=True))
+                checked |= unchecked
+
+            pending = []
+            for position, (ids, distances) in candidates.items():
+                keep = [
+                    column
+                    for column, spot_id in enumerate(ids.tolist())
+                    if spot_id in matching
+                ][:k]
+                # A full candidate list may hide matches further out
+                if len(keep) < k and len(ids) == wanted and wanted < len(index):
+                    pending.append(position)
+                    continue
+                nearest[position] = (ids[keep].tolist(), distances[keep].tolist())
+            wanted *= 2
+
+        # Each spot is loaded and serialized once, however many origins it is near
+        spot_ids = {spot_id for ids, _ in nearest for spot_id in ids}
+        spots = ParkingSpot.objects.in_bulk(spot_ids)
+        serialized = {
+            spot_id: ParkingSpotListSerializer(spot).data
+            for spot_id, spot in spots.items()
+        }
+
+        results = []
+        for origin, (ids, distances) in zip(origins, nearest):
+            results.append(
+                {
+                    "origin": origin,
+                    "spots": [
+                        {**serialized[spot_id], "distance": round(distance, 3)}
+                        for spot_id, distance in zip(ids, distances)
+                    ],
+                }
+            )
+        return Response({"results": results})
+
+
 class ParkingSpotRetrieveAPIView(generics.RetrieveAPIView):
     queryset = ParkingSpot.objects.filter(is_active=True)
     serializer_class = ParkingSpotDetailSerializer
     lookup_field = "uuid"
 
 
+class ParkingSpotCalendarAPIView(APIView):
+    """
+    Free windows per vehicle type for a parking spot over the next days.
+
+    Query Parameters:
+        days (int, optional): How many days ahead to look, 7 by default.
+        vehicle_types (optional): Only these vehicle types.
+
+    The spot's weekly opening hours (always open when it has none) and its
+    bookings are combined in one sweep per vehicle type. A window is free when
+    the spot is open and at least one place for the vehicle type is neither
+    booked nor held; bookings count in whole 15 minute slots, as when booking.
+
+    Example Response:
+        HTTP 200 OK
+        {
+            "from": "2024-12-25T10:00:00Z",
+            "to": "2025-01-01T10:00:00Z",
+            "vehicleTypes": {
+                "SUV": {
+                    "capacity": 2,
+                    "free": [
+                        {"start": "2024-12-25T10:00:00Z", "end": "2024-12-25T18:00:00Z"}
+                    ]
+                }
+            }
+        }
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, uuid, *args, **kwargs):
+        parking_spot = get_object_or_404(ParkingSpot, uuid=uuid, is_active=True)
+        days = self.get_days()
+        vehicle_types = self.get_vehicle_types()
+
+        start = timezone.now().replace(second=0, microsecond=0)
+        end = start + timedelta(days=days)
+
+        capacities = {}
+        for vehicle_type, capacity in ParkingSpotVehicleCapacity.objects.filter(
+            parking_spot=parking_spot, is_active=True
+        ).values_list("vehicle_type", "capacity"):
+            if not vehicle_types or vehicle_type in vehicle_types:
+                capacities[vehicle_type] = capacities.get(vehicle_type, 0) + capacity
+
+        openings = opening_windows(
+            list(
+                parking_spot.availabilities.filter(is_active=True).values_list(
+                    "day", "start_time", "end_time"
+                )
+            ),
+            start,
+            end,
+        )
+
+        bookings = {}
+        for vehicle, booking_start, booking_end in (
+            Booking.objects.overlapping(start, end)
+            .filter(parking_spot=parking_spot, vehicle__in=capacities)
+            .values_list("vehicle", "start_time", "end_time")
+        ):
+            bookings.setdefault(vehicle, []).append((booking_start, booking_end))
+        for vehicle, hold_start, hold_end in BookingHold.objects.filter(
+            parking_spot=parking_spot,
+            vehicle__in=capacities,
+            start_time__lt=end,
+            end_time__gt=start,
+            expires_at__gt=timezone.now(),
+        ).values_list("vehicle", "start_time", "end_time"):
+            bookings.setdefault(vehicle, []).append((hold_start, hold_end))
+
+        return Response(
+            {
+                "from": start,
+                "to": end,
+                "vehicle_types": {
+                    vehicle_type: {
+                        "capacity": capacity,
+                        "free": [
+                            {"start": window_start, "end": window_end}
+                            for window_start, window_end in free_windows(
+                                openings,
+                                bookings.get(vehicle_type, ()),
+                                capacity,
+                                start,
+                                end,
+                            )
+                        ],
+                    }
+                    for vehicle_type, capacity in capacities.items()
+                },
+            }
+        )
+
+    def get_days(self):
+        try:
+            days = int(self.request.query_params.get("days", CALENDAR_DAYS))
+        except ValueError:
+            raise ValidationError({"days": "A valid integer is required."}) from None
+        if not 1 <= days <= CALENDAR_MAX_DAYS:
+            raise ValidationError(
+                {"days": f"Must be between 1 and {CALENDAR_MAX_DAYS}."}
+            )
+        return days
+
+    def get_vehicle_types(self):
+        vehicle_types = set(self.request.query_params.getlist("vehicle_types"))
+        valid = {value for value, _ in VEHICLE_TYPES}
+        if not vehicle_types <= valid:
+            raise ValidationError({"vehicle_types": "Invalid vehicle type."})
+        return vehicle_types
+
+
 class SearchSuggestionsAPIView(APIView):
     """
     API endpoint to provide search suggestions for parking spots.
 
     This endpoint accepts a query parameter `search` and returns a list of suggestions
-    based on matches with parking spot names, addresses, or postcodes. The results
-    are filtered to include only active parking spots and limited to the top 10 matches.
+    based on matches with parking spot names, addresses, or postcodes. Matching is done
+    against a per-worker prefix index rather than searched in the database: a keystroke
+    only reads the catalog version, to tell whether the index is current, and popular
+    queries are answered from the shared cache without any query. The results include
+    only active parking spots and are limited to the top 10 matches.
 
     Query Parameters:
         search (str): The search input provided by the user to filter parking spots.
-                      Partial matches are supported for names, addresses, and postcodes.
+                      Every word must be the start of a word in the spot's name,
+                      address or postcode (e.g. "gre par" matches "Green Park").
+        latitude, longitude (float, optional): Rank suggestions by proximity, looking
+                      only at the nearest spots found by the worker's spatial index.
+        radius (float, optional): Only suggest spots within this many km.
 
     Example Request:
         GET /api/v1/public/parking-app/search-suggestions?search=park
@@ -126,7 +916,12 @@ class SearchSuggestionsAPIView(APIView):
 
     Notes:
         - The search query is case-insensitive.
+        - Spots whose name starts with the query rank first, then name, address
+          and postcode word matches.
         - Results are filtered to ensure only active parking spots are included.
+        - Queries are recorded, and the suggestions of the most popular ones are
+          cached by `precompute_search_suggestions` in the cache shared by every
+          worker.
         - If no matches are found, the `suggestions` list will be empty.
 
     Returns:
@@ -134,22 +929,27 @@ class SearchSuggestionsAPIView(APIView):
     """
 
     def get(self, request, *args, **kwargs):
-        query = request.query_params.get("search", "").strip()
+        query = normalize_query(request.query_params.get("search", ""))
         suggestions = []
 
         if query:
-            # Filter ParkingSpot objects based on name, address, or postcode
-            matches = ParkingSpot.objects.filter(
-                Q(name__icontains=query)
-                | Q(address__icontains=query)
-                | Q(postcode__icontains=query),
-                is_active=True,
-            ).values("address", "name")[
-                :10
-            ]  # Limit to top 10 results
-
-            # Format suggestions as an array of addresses
-            suggestions = list({match["address"].strip().lower() for match in matches})
+            record_query(query)
+            origin = parse_origin(request.query_params)
+            if origin is None:
+                # Popular queries are served from the shared cache
+                suggestions = cached_suggestions(query)
+            else:
+                latitude, longitude, radius = origin
+                ids, _ = get_spatial_index().nearest(
+                    latitude, longitude, SUGGESTION_NEAREST_CANDIDATES, radius
+                )
+                order = {
+                    spot_id: position for position, spot_id in enumerate(ids.tolist())
+                }
+
+                # Ranked matches from the worker's prefix index over names,
+                # addresses and postcodes
+                suggestions = suggest(query, limit=SUGGESTION_LIMIT, order=order)
 
         return Response({"suggestions": suggestions})
 
@@ -163,6 +963,22 @@ class ParkingSpotReviewCreateAPIView(generics.CreateAPIView):
         return super().perform_create(serializer)
 
 
+class BookingHoldCreateAPIView(generics.CreateAPIView):
+    """
+    API endpoint for holding a place for a few minutes during checkout.
+
+    The returned `uuid` is passed as `hold` to create-booking with the same
+    spot, vehicle and times before `expires_at`; the booking then takes the
+    held place without checking capacity again.
+    """
+
+    queryset = BookingHold.objects.all()
+    serializer_class = BookingHoldCreateSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
 class BookingCreateAPIView(generics.CreateAPIView):
     """
     API endpoint for creating a new booking.
@@ -172,6 +988,12 @@ class BookingCreateAPIView(generics.CreateAPIView):
     serializer_class = BookingCreateSerializer
 
     def post(self, request, *args, **kwargs):
+        # Retries sent with the same `Idempotency-Key` header replay the
+        # response instead of creating another booking
+        return respond_idempotently(request, self.create_booking)
+
+    def create_booking(self):
+        request = self.request
         serializer = BookingCreateSerializer(data=request.data)
         if serializer.is_valid():
             booking = serializer.save(user=request.user)
@@ -187,3 +1009,42 @@ class BookingCreateAPIView(generics.CreateAPIView):
                 status=status.HTTP_201_CREATED,
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BulkBookingCreateAPIView(generics.CreateAPIView):
+    """
+    API endpoint for booking a spot for many windows at once, e.g. every
+    weekday of a month. All the bookings are created in one transaction.
+    """
+
+    serializer_class = BulkBookingCreateSerializer
+
+    def post(self, request, *args, **kwargs):
+        return respond_idempotently(request, self.create_bookings)
+
+    def create_bookings(self):
+        request = self.request
+        serializer = BulkBookingCreateSerializer(data=request.data)
+        if serializer.is_valid():
+            bookings = serializer.save(user=request.user)
+            # Money is rendered as a two-decimal string, as the serializers do
+            amount = sum(booking.amount for booking in bookings)
+            return Response(
+                {
+                    "message": "Bookings created successfully.",
+                    "amount": f"{amount:.2f}",
+                    "bookings": [
+                        {
+                            "booking_no": booking.booking_no,
+                            "status": booking.status,
+                            "start_time": booking.start_time,
+                            "end_time": booking.end_time,
+                            "amount": f"{booking.amount:.2f}",
+                            "payment_status": booking.payment_status,
+                        }
+                        for booking in bookings
+                    ],
+                },
+                status=status.HTTP_201_CREATED,
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
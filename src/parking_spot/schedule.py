@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.db.models.functions import Substr
+from django.utils import timezone
+
+from src.parking_spot.constants import DAYS_OF_WEEK
+from src.parking_spot.fields import BitStringField
+
+# The week from Monday 00:00 in quarter hours, one bit per quarter
+SCHEDULE_SLOT = timedelta(minutes=15)
+SLOTS_PER_DAY = 96
+SCHEDULE_SLOTS = 7 * SLOTS_PER_DAY
+ALWAYS_OPEN = "1" * SCHEDULE_SLOTS
+
+DAY_INDEX = {code: index for index, (code, _) in enumerate(DAYS_OF_WEEK)}
+
+
+def always_open():
+    return ALWAYS_OPEN
+
+
+def _slot_of_day(value, round_up=False):
+    minutes = value.hour * 60 + value.minute
+    if not round_up:
+        return minutes // 15
+    return -(-(minutes + bool(value.second or value.microsecond)) // 15)
+
+
+def compile_schedule(availabilities):
+    """
+    Weekly bitset of the `(day, start_time, end_time)` opening hours. A
+    quarter is only open if the hours cover all of it; a row ending at or
+    before its start runs past midnight. Without any rows the spot is always
+    open.
+    """
+    if not availabilities:
+        return ALWAYS_OPEN
+
+    bits = ["0"] * SCHEDULE_SLOTS
+    for day, start_time, end_time in availabilities:
+        first = DAY_INDEX[day] * SLOTS_PER_DAY + _slot_of_day(start_time, round_up=True)
+        last = DAY_INDEX[day] * SLOTS_PER_DAY + _slot_of_day(end_time)
+        if end_time <= start_time:
+            last += SLOTS_PER_DAY
+        for slot in range(first, last):
+            bits[slot % SCHEDULE_SLOTS] = "1"
+    return "".join(bits)
+
+
+def schedule_slices(start, end):
+    """
+    The `(offset, length)` runs of schedule bits touched by `[start, end)`,
+    at most two as the period may wrap past the end of the week.
+    """
+    local_start = timezone.localtime(start)
+    first = local_start.weekday() * SLOTS_PER_DAY + _slot_of_day(local_start.time())
+    slot_start = local_start.replace(
+        minute=local_start.minute - local_start.minute % 15, second=0, microsecond=0
+    )
+    count = -(-(end - slot_start) // SCHEDULE_SLOT)
+    if count >= SCHEDULE_SLOTS:
+        return [(0, SCHEDULE_SLOTS)]
+    if first + count <= SCHEDULE_SLOTS:
+        return [(first, count)]
+    return [(first, SCHEDULE_SLOTS - first), (0, first + count - SCHEDULE_SLOTS)]
+
+
+def schedule_covers(schedule, start, end):
+    """Whether the bitset is open for the whole of `[start, end)`."""
+    return all(
+        schedule[offset : offset + length] == "1" * length
+        for offset, length in schedule_slices(start, end)
+    )
+
+
+def filter_open(queryset, start, end, field="weekly_schedule"):
+    """Spots whose weekly bitset is open for the whole of `[start, end)`."""
+    for position, (offset, length) in enumerate(schedule_slices(start, end)):
+        alias = f"{field}_slice_{position}"
+        queryset = queryset.alias(
+            **{
+                alias: Substr(
+                    field,
+                    offset + 1,
+                    length,
+                    output_field=BitStringField(length=length),
+                )
+            }
+        ).filter(**{alias: "1" * length})
+    return queryset
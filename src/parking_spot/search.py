@@ -0,0 +1,24 @@
+from django.contrib.postgres.search import SearchVector
+
+from src.parking_spot.models import ParkingSpot
+
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR_FIELDS = ["name", "address", "description"]
+
+
+def parking_spot_search_vector():
+    """Weighted tsvector of a spot: name (A), address (B), description (C)."""
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("address", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored search vector of the spots in the queryset."""
+    return queryset.update(search_vector=parking_spot_search_vector())
+
+
+def update_search_vector(parking_spot):
+    update_search_vectors(ParkingSpot.objects.filter(pk=parking_spot.pk))
@@ -3,6 +3,10 @@ from django.db import transaction
 
 from src.base.serializers import AbstractInfoRetrieveSerializer
 from src.libs.get_context import get_user_by_context
+from src.parking_spot.utils import (
+    refresh_parking_spot_masks,
+    refresh_parking_spot_schedule,
+)
 
 from .models import (
     Booking,
@@ -116,22 +120,26 @@ class ParkingSpotCreateSerializer(serializers.ModelSerializer):
         features = validated_data.pop("features", [])
         vehicles_capacity = validated_data.pop("vehicles_capacity", [])
 
-        parking_spot = ParkingSpot.objects.create(
-            owner=created_by, created_by=created_by, **validated_data
-        )
-
-        for availability in availabilities:
-            ParkingSpotAvailability.objects.create(
-                parking_spot=parking_spot, **availability
+        with transaction.atomic():
+            parking_spot = ParkingSpot.objects.create(
+                owner=created_by, created_by=created_by, **validated_data
             )
 
-        for feature in features:
-            ParkingSpotFeatures.objects.create(parking_spot=parking_spot, **feature)
+            for availability in availabilities:
+                ParkingSpotAvailability.objects.create(
+                    parking_spot=parking_spot, **availability
+                )
 
-        for vehicle_capacity in vehicles_capacity:
-            ParkingSpotVehicleCapacity.objects.create(
-                parking_spot=parking_spot, **vehicle_capacity
-            )
+            for feature in features:
+                ParkingSpotFeatures.objects.create(parking_spot=parking_spot, **feature)
+
+            for vehicle_capacity in vehicles_capacity:
+                ParkingSpotVehicleCapacity.objects.create(
+                    parking_spot=parking_spot, **vehicle_capacity
+                )
+
+            refresh_parking_spot_masks(parking_spot.id)
+            refresh_parking_spot_schedule(parking_spot.id)
 
         return parking_spot
 
@@ -234,6 +242,8 @@ class ParkingSpotUpdateSerializer(serializers.ModelSerializer):
                 ParkingSpotVehicleCapacity,
                 "vehicle_capacity",
             )
+            refresh_parking_spot_masks(instance.id)
+            refresh_parking_spot_schedule(instance.id)
 
         return instance
 
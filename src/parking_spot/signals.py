@@ -0,0 +1,72 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from src.parking_spot.catalog import schedule_catalog_version_bump
+from src.parking_spot.clustering import cluster_entry, update_clusters
+from src.parking_spot.models import ParkingSpot
+from src.parking_spot.search import SEARCH_VECTOR_FIELDS, update_search_vector
+from src.parking_spot.suggestions import (
+    SUGGESTION_FIELDS,
+    schedule_suggestion_invalidation,
+)
+
+CLUSTER_FIELDS = ["latitude", "longitude", "rate_per_hour", "is_active", "is_archived"]
+# Fields read by the version-keyed catalog caches (spatial index, suggestion
+# index, facets); changing any other field does not bump the version
+CATALOG_FIELDS = CLUSTER_FIELDS + ["rate_per_day", "name", "address", "postcode"]
+TRACKED_FIELDS = list(
+    dict.fromkeys(CATALOG_FIELDS + SEARCH_VECTOR_FIELDS + SUGGESTION_FIELDS)
+)
+
+
+def tracked_state(instance, fields):
+    """
+    The instance's values of `fields`, converted as they would be read back
+    from the database, e.g. a rate assigned as "2.00" becomes a Decimal.
+    """
+    return {
+        field: ParkingSpot._meta.get_field(field).to_python(getattr(instance, field))
+        for field in fields
+    }
+
+
+@receiver(pre_save, sender=ParkingSpot)
+def remember_previous_state(sender, instance, **kwargs):
+    instance._previous_state = None
+    if instance.pk:
+        instance._previous_state = (
+            ParkingSpot.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+        )
+
+
+@receiver(post_save, sender=ParkingSpot)
+def sync_parking_spot_catalog(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_state", None)
+    current = tracked_state(instance, TRACKED_FIELDS)
+    update_clusters(
+        cluster_entry(previous) if previous else None, cluster_entry(current)
+    )
+    if previous is None or any(
+        previous[field] != current[field] for field in SEARCH_VECTOR_FIELDS
+    ):
+        update_search_vector(instance)
+    if previous is None or any(
+        previous[field] != current[field] for field in CATALOG_FIELDS
+    ):
+        schedule_catalog_version_bump()
+    # Scheduled after the bump, so that an entry recomputed once it has run
+    # comes from a refreshed index
+    if previous is None or any(
+        previous[field] != current[field] for field in SUGGESTION_FIELDS
+    ):
+        schedule_suggestion_invalidation(previous, current)
+
+
+@receiver(post_delete, sender=ParkingSpot)
+def remove_parking_spot_from_catalog(sender, instance, **kwargs):
+    current = tracked_state(instance, TRACKED_FIELDS)
+    update_clusters(cluster_entry(current), None)
+    schedule_catalog_version_bump()
+    schedule_suggestion_invalidation(current)
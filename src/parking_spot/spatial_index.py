@@ -0,0 +1,187 @@
+import heapq
+import threading
+
+import numpy as np
+
+from src.parking_spot.catalog import current_catalog_version
+from src.parking_spot.geo import EARTH_RADIUS_KM
+from src.parking_spot.models import ParkingSpot
+
+
+def _unit_vectors(latitudes, longitudes):
+    lat = np.radians(latitudes)
+    lng = np.radians(longitudes)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+def _km_to_chord(distance):
+    return 2 * np.sin(min(distance / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class SpatialIndex:
+    """
+    Static KD-tree over the spots' positions on the unit sphere.
+
+    Points are stored as 3D unit vectors, so the straight-line (chord) distance
+    between two points grows monotonically with their great-circle distance and
+    the tree can prune on plain axis-aligned boxes. Each node covers a
+    contiguous slice of the reordered point arrays; leaves are scanned with
+    vectorized NumPy distance computations.
+    """
+
+    LEAF_SIZE = 32
+
+    def __init__(self, ids, latitudes, longitudes):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.points = _unit_vectors(
+            np.asarray(latitudes, dtype=np.float64),
+            np.asarray(longitudes, dtype=np.float64),
+        )
+        self.starts = []
+        self.ends = []
+        self.children = []
+        self.box_min = []
+        self.box_max = []
+        if len(self.ids):
+            self._build()
+        self.box_min = np.array(self.box_min)
+        self.box_max = np.array(self.box_max)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _build(self):
+        order = np.arange(len(self.ids))
+        stack = [(0, len(order), None, 0)]
+        while stack:
+            start, end, parent, side = stack.pop()
+            node = len(self.starts)
+            points = self.points[order[start:end]]
+            self.starts.append(start)
+            self.ends.append(end)
+            self.children.append(None)
+            self.box_min.append(points.min(axis=0))
+            self.box_max.append(points.max(axis=0))
+            if parent is not None:
+                self.children[parent][side] = node
+
+            if end - start <= self.LEAF_SIZE:
+                continue
+
+            axis = int(np.argmax(self.box_max[node] - self.box_min[node]))
+            middle = (end - start) // 2
+            partition = np.argpartition(points[:, axis], middle)
+            order[start:end] = order[start:end][partition]
+            self.children[node] = [None, None]
+            stack.append((start + middle, end, node, 1))
+            stack.append((start, start + middle, node, 0))
+
+        self.ids = self.ids[order]
+        self.points = self.points[order]
+
+    def _box_distance(self, node, point):
+        gap = np.maximum(self.box_min[node] - point, 0) + np.maximum(
+            point - self.box_max[node], 0
+        )
+        return float(np.sqrt(gap @ gap))
+
+    def _leaf_distances(self, node, point):
+        delta = self.points[self.starts[node] : self.ends[node]] - point
+        return np.sqrt(np.einsum("ij,ij->i", delta, delta))
+
+    def query_radius(self, latitude, longitude, radius):
+        """Ids and distances (km) of every spot within `radius` km, nearest first."""
+        if not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        point = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        limit = _km_to_chord(radius)
+        found_ids = []
+        found_chords = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._box_distance(node, point) > limit:
+                continue
+            if self.children[node] is not None:
+                stack.extend(self.children[node])
+                continue
+            chords = self._leaf_distances(node, point)
+            mask = chords <= limit
+            found_ids.append(self.ids[self.starts[node] : self.ends[node]][mask])
+            found_chords.append(chords[mask])
+
+        if not found_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids = np.concatenate(found_ids)
+        chords = np.concatenate(found_chords)
+        order = np.argsort(chords, kind="stable")
+        return ids[order], _chord_to_km(chords[order])
+
+    def nearest(self, latitude, longitude, k, radius=None):
+        """Ids and distances (km) of the `k` nearest spots, optionally within `radius` km."""
+        if not len(self) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        point = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        limit = _km_to_chord(radius) if radius is not None else np.inf
+        # Max-heap (negated chords) of the best k candidates found so far
+        best = []
+        queue = [(self._box_distance(0, point), 0)]
+        while queue:
+            box_distance, node = heapq.heappop(queue)
+            bound = -best[0][0] if len(best) == k else limit
+            if box_distance > bound:
+                break
+            if self.children[node] is not None:
+                for child in self.children[node]:
+                    heapq.heappush(queue, (self._box_distance(child, point), child))
+                continue
+
+            chords = self._leaf_distances(node, point)
+            for position in np.flatnonzero(chords <= bound):
+                chord = float(chords[position])
+                item = (-chord, int(self.ids[self.starts[node] + position]))
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                elif chord < -best[0][0]:
+                    heapq.heapreplace(best, item)
+
+        best.sort(reverse=True)
+        ids = np.array([spot_id for _, spot_id in best], dtype=np.int64)
+        chords = np.array([-chord for chord, _ in best])
+        return ids, _chord_to_km(chords)
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_spatial_index():
+    """
+    The worker's spatial index of active spots, rebuilt when the catalog
+    version changed since it was last built.
+    """
+    global _index, _index_version
+
+    version = current_catalog_version()
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            rows = np.array(
+                ParkingSpot.objects.filter(is_active=True).values_list(
+                    "id", "latitude", "longitude"
+                ),
+                dtype=np.float64,
+            ).reshape(-1, 3)
+            _index = SpatialIndex(rows[:, 0], rows[:, 1], rows[:, 2])
+            _index_version = version
+    return _index
@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from src.parking_spot.autocomplete import spot_tokens, suggest, tokenize
+from src.parking_spot.models import SuggestionQuery
+
+SUGGESTION_LIMIT = 10
+SUGGESTION_QUERY_MAX_LENGTH = 100
+SUGGESTION_CACHE_TIMEOUT = 60 * 60 * 24
+SUGGESTION_CACHE_PREFIX = "parking_spot:suggestions:"
+# The set of queries whose results were precomputed
+POPULAR_SUGGESTIONS_KEY = "parking_spot:popular_suggestions"
+
+# Recorded queries are counted in memory and written out at most this often
+SUGGESTION_FLUSH_INTERVAL = 30
+SUGGESTION_FLUSH_SIZE = 200
+SUGGESTION_FIELDS = ["name", "address", "postcode", "is_active"]
+
+
+def normalize_query(query):
+    """Lowercased words of the query, e.g. `Green-Park ` -> `green park`."""
+    return " ".join(tokenize(query))
+
+
+def suggestion_cache_key(query):
+    return SUGGESTION_CACHE_PREFIX + hashlib.md5(query.encode()).hexdigest()
+
+
+def cached_suggestions(query):
+    """
+    Suggestions for a normalized query. Popular queries are answered from the
+    shared cache (`CACHE_URL`) without touching the database; one whose entry
+    was invalidated is recomputed and cached again.
+    """
+    key = suggestion_cache_key(query)
+    cached = cache.get_many([key, POPULAR_SUGGESTIONS_KEY])
+    if key in cached:
+        return cached[key]
+
+    suggestions = suggest(query, SUGGESTION_LIMIT)
+    if query in cached.get(POPULAR_SUGGESTIONS_KEY, ()):
+        cache.set(key, suggestions, SUGGESTION_CACHE_TIMEOUT)
+    return suggestions
+
+
+def precompute_suggestions(queries):
+    """Cache the suggestions of the given normalized queries."""
+    queries = set(queries)
+    cache.set_many(
+        {
+            suggestion_cache_key(query): suggest(query, SUGGESTION_LIMIT)
+            for query in queries
+        },
+        SUGGESTION_CACHE_TIMEOUT,
+    )
+    cache.set(POPULAR_SUGGESTIONS_KEY, queries, SUGGESTION_CACHE_TIMEOUT)
+
+
+def _matches(query, tokens):
+    return all(
+        any(token.startswith(word) for token in tokens) for word in query.split()
+    )
+
+
+def invalidate_suggestions(*parking_spots):
+    """
+    Drop the cached suggestions that may list any of the given spot states
+    (dicts of `SUGGESTION_FIELDS`, e.g. before and after an update).
+    """
+    tokens = set()
+    for parking_spot in parking_spots:
+        if parking_spot and parking_spot["is_active"]:
+            tokens.update(
+                spot_tokens(
+                    parking_spot["name"],
+                    parking_spot["address"],
+                    parking_spot["postcode"],
+                )
+            )
+    if not tokens:
+        return
+
+    popular = cache.get(POPULAR_SUGGESTIONS_KEY, ())
+    cache.delete_many(
+        [suggestion_cache_key(query) for query in popular if _matches(query, tokens)]
+    )
+
+
+def schedule_suggestion_invalidation(*parking_spots):
+    """Invalidate once the current transaction commits."""
+    transaction.on_commit(lambda: invalidate_suggestions(*parking_spots))
+
+
+_recorded = Counter()
+_recorded_since = time.monotonic()
+_recorded_lock = threading.Lock()
+
+
+def record_query(query):
+    """Count a normalized query, flushing the worker's counts when due."""
+    global _recorded, _recorded_since
+
+    if not query or len(query) > SUGGESTION_QUERY_MAX_LENGTH:
+        return
+
+    with _recorded_lock:
+        _recorded[query] += 1
+        if (
+            len(_recorded) < SUGGESTION_FLUSH_SIZE
+            and time.monotonic() - _recorded_since < SUGGESTION_FLUSH_INTERVAL
+        ):
+            return
+        counts, _recorded = _recorded, Counter()
+        _recorded_since = time.monotonic()
+
+    flush_query_counts(counts)
+
+
+def flush_query_counts(counts):
+    now = timezone.now()
+    with transaction.atomic():
+        # Sorted so that concurrent flushes lock rows in the same order
+        for query, count in sorted(counts.items()):
+            updated = SuggestionQuery.objects.filter(query=query).update(
+                count=F("count") + count, last_searched_at=now
+            )
+            if updated:
+                continue
+            _, created = SuggestionQuery.objects.get_or_create(
+                query=query, defaults={"count": count, "last_searched_at": now}
+            )
+            if not created:
+                SuggestionQuery.objects.filter(query=query).update(
+                    count=F("count") + count, last_searched_at=now
+                )
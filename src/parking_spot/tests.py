@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+import numpy as np
+from django.test import TestCase, override_settings
+
+from src.parking_spot.models import ParkingSpot
+from src.parking_spot.postcodes import POSTCODE_DTYPE
+from src.user.models import User
+
+
+@override_settings(POSTCODE_CENTROIDS_PATH="/nonexistent/postcode_centroids.npy")
+class ParkingSpotPostcodeSearchTests(TestCase):
+    url = "/api/v1/public/parking-app/parking-spots"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.centroids_dir = tempfile.mkdtemp()
+        cls.centroids_path = os.path.join(cls.centroids_dir, "centroids.npy")
+        centroids = np.array(
+            [(b"EH1 1YZ", 55.9533, -3.1883), (b"N1 9AL", 51.5308, -0.1238)],
+            dtype=POSTCODE_DTYPE,
+        )
+        np.save(cls.centroids_path, centroids)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.centroids_dir)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user("owner", "owner@example.com", "password")
+        spots = [
+            ("A1 Car Park", "Great North Road", "N1 9AL", 51.53, -0.12),
+            ("Corner Garage", "High Street", "A1 2BB", 51.53, -0.12),
+            ("Station Parking", "Kings Cross", "N1C 4AX", 51.53, -0.12),
+            ("Castle Car Park", "Royal Mile", "EH1 1YZ", 55.95, -3.19),
+        ]
+        # Run the catalog version bumps, so the spatial index sees the spots
+        with cls.captureOnCommitCallbacks(execute=True):
+            for name, address, postcode, latitude, longitude in spots:
+                ParkingSpot.objects.create(
+                    owner=owner,
+                    created_by=owner,
+                    name=name,
+                    description="",
+                    address=address,
+                    postcode=postcode,
+                    latitude=latitude,
+                    longitude=longitude,
+                    rate_per_hour=Decimal("2.00"),
+                    rate_per_day=Decimal("20.00"),
+                )
+
+    def search(self, term):
+        response = self.client.get(self.url, {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_postcode_shaped_search_still_matches_names(self):
+        # "A1" has no known centroid: the name match is kept alongside the
+        # postcode prefix match
+        names = {spot["name"] for spot in self.search("A1")}
+        self.assertIn("A1 Car Park", names)
+        self.assertIn("Corner Garage", names)
+        self.assertNotIn("Station Parking", names)
+        self.assertNotIn("Castle Car Park", names)
+
+    def test_known_postcode_searches_nearby_spots(self):
+        with self.settings(POSTCODE_CENTROIDS_PATH=self.centroids_path):
+            results = self.search("n19al")
+
+        # Every spot near the centroid is found whatever its text, and the
+        # distant one is left out
+        self.assertEqual(
+            {spot["name"] for spot in results},
+            {"A1 Car Park", "Corner Garage", "Station Parking"},
+        )
+        for spot in results:
+            self.assertLess(spot["distance"], 1)
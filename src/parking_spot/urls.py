@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (
     BookingListView,
+    BookingLookupView,
     BookingStatusUpdateView,
     ParkingSpotAvailabilityDeleteView,
     ParkingSpotFeaturesDeleteView,
@@ -16,6 +17,11 @@ router.register(r"parking-spots", ParkingSpotViewSet, basename="parking-spots")
 
 urlpatterns = [
     path("bookings", BookingListView.as_view(), name="booking-list"),
+    path(
+        "bookings/by-number/<str:booking_no>",
+        BookingLookupView.as_view(),
+        name="booking-lookup",
+    ),
     path(
         "bookings/<int:pk>/update-status",
         BookingStatusUpdateView.as_view(),
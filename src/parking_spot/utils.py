@@ -1,12 +1,89 @@
-import uuid
+from django.db import connection
 from django.utils.timezone import now
 
-def generate_booking_no(parking_spot_id: int) -> str:
+from src.parking_spot.catalog import schedule_catalog_version_bump
+from src.parking_spot.constants import (
+    BOOKING_NO_DIGITS,
+    BOOKING_NO_SEQUENCE,
+    FEATURE_BITS,
+    VEHICLE_TYPE_BITS,
+)
+from src.parking_spot.models import (
+    ParkingSpot,
+    ParkingSpotAvailability,
+    ParkingSpotFeatures,
+    ParkingSpotVehicleCapacity,
+)
+from src.parking_spot.schedule import compile_schedule
+
+def generate_booking_no() -> str:
+    """
+    Generates a unique booking number from the booking number sequence.
+    Format: BOOK-<YYYYMMDD>-<SEQUENCE>
+    Example: BOOK-20241225-00001234
+
+    The sequence never restarts, so numbers stay unique across days and sort
+    by date and then by creation order. `nextval` does not wait on other
+    transactions, so concurrent bookings never block each other here.
+    """
+    return generate_booking_nos(1)[0]
+
+
+def generate_booking_nos(count: int) -> list:
+    """`count` booking numbers (see `generate_booking_no`) in one query."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [BOOKING_NO_SEQUENCE, count],
+        )
+        sequences = sorted(sequence for (sequence,) in cursor.fetchall())
+    date_part = now().strftime('%Y%m%d')
+    return [
+        f"BOOK-{date_part}-{sequence:0{BOOKING_NO_DIGITS}d}" for sequence in sequences
+    ]
+
+
+def bitmask(values, bits) -> int:
+    """OR of the bits of the given values, e.g. `bitmask(["CCTV"], FEATURE_BITS)`."""
+    mask = 0
+    for value in values:
+        mask |= bits[value]
+    return mask
+
+
+def refresh_parking_spot_masks(parking_spot_id: int) -> None:
+    """
+    Recompute the spot's feature and vehicle type masks from its active rows.
+    Written with `update()` so the spot's save signals are not triggered; the
+    catalog version is bumped here instead, if the masks changed.
+    """
+    features = ParkingSpotFeatures.objects.filter(
+        parking_spot_id=parking_spot_id, is_active=True
+    ).values_list("feature", flat=True)
+    vehicle_types = ParkingSpotVehicleCapacity.objects.filter(
+        parking_spot_id=parking_spot_id, is_active=True
+    ).values_list("vehicle_type", flat=True)
+    masks = {
+        "features_mask": bitmask(features, FEATURE_BITS),
+        "vehicle_types_mask": bitmask(vehicle_types, VEHICLE_TYPE_BITS),
+    }
+    if ParkingSpot.objects.filter(pk=parking_spot_id).exclude(**masks).update(**masks):
+        schedule_catalog_version_bump()
+
+
+def refresh_parking_spot_schedule(parking_spot_id: int) -> None:
     """
-    Generates a unique booking number.
-    Format: BOOK-<YYYYMMDD>-<PARKING_SPOT_ID>-<RANDOM_STRING>
-    Example: BOOK-20241225-1234-8F2A6
+    Recompile the spot's weekly schedule bitset from its active availability
+    rows. Written with `update()` so the spot's save signals are not triggered;
+    the catalog version is bumped here instead, if the schedule changed.
     """
-    date_part = now().strftime('%Y%m%d')  
-    random_part = uuid.uuid4().hex[:5].upper()  
-    return f"BOOK-{date_part}-{parking_spot_id}-{random_part}"
+    availabilities = ParkingSpotAvailability.objects.filter(
+        parking_spot_id=parking_spot_id, is_active=True
+    ).values_list("day", "start_time", "end_time")
+    schedule = compile_schedule(list(availabilities))
+    if (
+        ParkingSpot.objects.filter(pk=parking_spot_id)
+        .exclude(weekly_schedule=schedule)
+        .update(weekly_schedule=schedule)
+    ):
+        schedule_catalog_version_bump()
@@ -1,13 +1,21 @@
+from django.db import transaction
 from django_filters.filterset import FilterSet
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 
+from src.libs.filters import FullTextSearchFilter, TrigramSearchFilter
+from src.parking_spot.bookings import change_booking_status
 from src.parking_spot.constants import STATUS_CHOICES
+from src.parking_spot.search import SEARCH_CONFIG
+from src.parking_spot.utils import (
+    refresh_parking_spot_masks,
+    refresh_parking_spot_schedule,
+)
 from .serializers import BookingSerializer, BookingStatusUpdateSerializer
 from rest_framework import status
 from rest_framework.views import APIView
@@ -42,12 +50,20 @@ class ParkingSpotViewSet(ModelViewSet):
     """
     Retrieve, create, update, or list parking spots.
     This API supports filtering, searching, and ordering of parking spots.
+    Descriptions are searched through the ranked `text_search` param.
     """
 
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend,
+        OrderingFilter,
+        TrigramSearchFilter,
+        FullTextSearchFilter,
+    ]
     filterset_class = FilterForParkingSpotViewSet
-    search_fields = ["name", "address", "description"]
+    search_fields = ["name", "address"]
+    search_vector_field = "search_vector"
+    search_config = SEARCH_CONFIG
     ordering = ["-created_at"]
     ordering_fields = ["name", "created_at"]
     http_method_names = ["options", "head", "get", "post", "patch"]
@@ -84,6 +100,7 @@ class ParkingSpotAvailabilityDeleteView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
             availability.delete()
+            refresh_parking_spot_schedule(availability.parking_spot_id)
             return Response(
                 {"detail": "Parking spot availability deleted successfully."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -109,6 +126,7 @@ class ParkingSpotVehicleCapacityDeleteView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
             vehicle_capacity.delete()
+            refresh_parking_spot_masks(vehicle_capacity.parking_spot_id)
             return Response(
                 {"detail": "Parking spot vehicle capacity deleted successfully."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -132,6 +150,7 @@ class ParkingSpotFeaturesDeleteView(APIView):
                     status=status.HTTP_403_FORBIDDEN,
                 )
             feature.delete()
+            refresh_parking_spot_masks(feature.parking_spot_id)
             return Response(
                 {"detail": "Parking spot feature deleted successfully."},
                 status=status.HTTP_204_NO_CONTENT,
@@ -159,6 +178,23 @@ class BookingListView(generics.ListAPIView):
         return Booking.objects.filter(parking_spot__owner=user, is_active=True)
 
 
+class BookingLookupView(generics.RetrieveAPIView):
+    """
+    Look up any booking by its booking number, for support staff. Served by
+    the unique index on the booking number.
+    """
+
+    serializer_class = BookingSerializer
+    permission_classes = [IsAdminUser]
+    queryset = Booking.objects.all()
+    lookup_field = "booking_no"
+
+    def get_object(self):
+        # Booking numbers are issued in upper case
+        self.kwargs["booking_no"] = self.kwargs["booking_no"].strip().upper()
+        return super().get_object()
+
+
 class BookingStatusUpdateView(generics.UpdateAPIView):
     serializer_class = BookingStatusUpdateSerializer
     permission_classes = [IsAuthenticated]
@@ -176,17 +212,19 @@ class BookingStatusUpdateView(generics.UpdateAPIView):
     def validate_status(self, status):
         STATUS_KEYS = {choice[0] for choice in STATUS_CHOICES}
         if status not in STATUS_KEYS:
-            return Response({"detail": "Invalid status."}, status=400)
+            raise ValidationError({"status": "Invalid status."})
         return status
-    
+
     def update(self, request, *args, **kwargs):
         """
         Override to handle the update process for status change.
         """
-        booking = self.get_object()
-        status = request.data.get("status")
-        self.validate_status(status)
-        booking.status = status
-        booking.save()
+        status = self.validate_status(request.data.get("status"))
+        with transaction.atomic():
+            # Locked so that concurrent updates see each other's status
+            booking = Booking.objects.select_for_update().get(pk=self.get_object().pk)
+            # Cancelling or completing a booking frees its place in the
+            # occupancy ledger; reopening one takes it again
+            change_booking_status(booking, status)
 
         return Response({"detail": "Booking status updated successfully."})